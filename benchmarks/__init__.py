@@ -0,0 +1,2 @@
+"""Benchmarks for mapbuilder, run from the repository root with python -m benchmarks.<name>.
+python -m benchmarks runs the staged suite, see benchmarks.suite."""
@@ -0,0 +1,166 @@
+"""Compares the AIXM reader with the previous untagged iterparse/findtext reader on a large
+synthetic AIXM file, both in run time and peak memory."""
+
+import argparse
+import multiprocessing
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+from lxml import etree
+from shapely import LinearRing, LineString
+
+from benchmarks.aixm_poslist import legacy_parse_pos_list
+from benchmarks.synthetic import write_aixm
+from mapbuilder.data.aixm2 import (
+    AIXM_NAMESPACES,
+    AIXM_POLY_TAGS,
+    AIXM_TAGS,
+    APRON_TAG,
+    TAXIWAY_TAG,
+    AIXMApron,
+    AIXMFeature,
+    AIXMTaxiway,
+    _ns,
+    new_dataset,
+    parse_aixm,
+    resolve_links,
+)
+
+
+def legacy_parse_aixm(xml_file):
+    """The previous reader: untagged iterparse, findtext() per attribute and one geometry
+    constructed per posList"""
+    result = new_dataset()
+    context = etree.iterparse(xml_file)
+
+    for _action, elem in context:
+        if elem.tag == APRON_TAG:
+            apn_id = elem.findtext("gml:identifier", namespaces=AIXM_NAMESPACES)
+            result["_Apron"][apn_id] = AIXMApron(
+                id=apn_id,
+                name=elem.findtext(".//aixm:name", namespaces=AIXM_NAMESPACES),
+                surface=elem.findtext(".//aixm:composition", namespaces=AIXM_NAMESPACES),
+                abandoned=elem.findtext(".//aixm:abandoned", namespaces=AIXM_NAMESPACES) == "YES",
+            )
+
+            elem.clear()
+        elif elem.tag == TAXIWAY_TAG:
+            twy_id = elem.findtext("gml:identifier", namespaces=AIXM_NAMESPACES)
+            result["_Taxiway"][twy_id] = AIXMTaxiway(
+                id=twy_id,
+                designator=elem.findtext(".//aixm:designator", namespaces=AIXM_NAMESPACES),
+                type=elem.findtext(".//aixm:type", namespaces=AIXM_NAMESPACES),
+                width=elem.findtext(".//aixm:width", namespaces=AIXM_NAMESPACES),
+                surface=elem.findtext(".//aixm:composition", namespaces=AIXM_NAMESPACES),
+                abandoned=elem.findtext(".//aixm:abandoned", namespaces=AIXM_NAMESPACES) == "YES",
+            )
+
+            elem.clear()
+        elif elem.tag in AIXM_TAGS:
+            feature_type = elem.tag.split("}")[1]
+            feature_id = elem.findtext("gml:identifier", namespaces=AIXM_NAMESPACES)
+            is_poly = elem.tag in AIXM_POLY_TAGS
+
+            feature = AIXMFeature(
+                id=feature_id,
+                feature=feature_type,
+                type=elem.findtext(".//aixm:type", namespaces=AIXM_NAMESPACES),
+                name=elem.findtext(".//aixm:name", namespaces=AIXM_NAMESPACES),
+                designator=elem.findtext(".//aixm:designator", namespaces=AIXM_NAMESPACES),
+                color=elem.findtext(".//aixm:colour", namespaces=AIXM_NAMESPACES),
+                style=elem.findtext(".//aixm:style", namespaces=AIXM_NAMESPACES),
+                marking_location=elem.findtext(
+                    ".//aixm:markingLocation",
+                    namespaces=AIXM_NAMESPACES,
+                ),
+                geometries=[],
+                geometry_type="poly" if is_poly else "line",
+            )
+
+            if feature_type == "ApronElement":
+                apron_link = elem.find(".//aixm:associatedApron", namespaces=AIXM_NAMESPACES)
+                if apron_link is not None:
+                    feature.apron = apron_link.attrib[_ns("xlink", "href")].replace("urn:uuid:", "")
+
+            if feature_type == "TaxiwayMarking":
+                twy_link = elem.find(".//aixm:markedTaxiway", namespaces=AIXM_NAMESPACES)
+                if twy_link is not None:
+                    feature.marked_taxiway = twy_link.attrib[_ns("xlink", "href")].replace(
+                        "urn:uuid:",
+                        "",
+                    )
+
+            if feature_type == "TaxiwayElement":
+                twy_link = elem.find(".//aixm:associatedTaxiway", namespaces=AIXM_NAMESPACES)
+                if twy_link is not None:
+                    feature.taxiway = twy_link.attrib[_ns("xlink", "href")].replace("urn:uuid:", "")
+
+            if feature_type == "GuidanceLineMarking":
+                twy_link = elem.find(".//aixm:markedGuidanceLine", namespaces=AIXM_NAMESPACES)
+                if twy_link is not None:
+                    feature.marked_guidance_line = twy_link.attrib[_ns("xlink", "href")].replace(
+                        "urn:uuid:",
+                        "",
+                    )
+
+            for poslist_element in elem.findall(".//gml:posList", namespaces=AIXM_NAMESPACES):
+                poslist = legacy_parse_pos_list(poslist_element.text)
+
+                if is_poly and len(poslist) > 2:
+                    feature.geometries.append(LinearRing(poslist))
+                else:
+                    feature.geometries.append(LineString(poslist))
+
+            if feature_type not in result:
+                result[feature_type] = {feature_id: feature}
+            else:
+                result[feature_type][feature_id] = feature
+
+            elem.clear()
+
+    resolve_links(result)
+    return result
+
+
+def _measure(func, path: Path, queue) -> None:
+    start = time.perf_counter()
+    dataset = func(path)
+    elapsed = time.perf_counter() - start
+    features = sum(len(dataset[key]) for key in ("ApronElement", "GuidanceLine"))
+    queue.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, features))
+
+
+def measure(func, path: Path) -> tuple[float, int, int]:
+    """Runs func in a fresh process, returns its run time, peak RSS (KiB) and a feature count"""
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_measure, args=(func, path, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main() -> None:
+    argp = argparse.ArgumentParser(description=__doc__)
+    argp.add_argument("--features", type=int, default=20000, help="Features per feature type")
+    argp.add_argument("--points", type=int, default=12, help="Points per geometry")
+    argp.add_argument("--check", action="store_true", help="Verify both readers agree")
+    args = argp.parse_args()
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        path = write_aixm(Path(tempdir) / "synthetic.aixm", args.features, args.points)
+        print(f"Synthetic AIXM file: {path.stat().st_size / 2**20:.1f} MiB")
+
+        if args.check:
+            assert legacy_parse_aixm(path) == parse_aixm(path)
+
+        for name, func in (("legacy", legacy_parse_aixm), ("current", parse_aixm)):
+            elapsed, max_rss, _ = measure(func, path)
+            print(f"{name:>8}: {elapsed:7.2f} s, peak RSS {max_rss / 1024:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Compares the per-coordinate posList reader with the NumPy based bulk reader"""
+
+import argparse
+import random
+import timeit
+from types import SimpleNamespace
+
+from shapely import LinearRing, LineString
+
+from mapbuilder.data.aixm2 import GeometryCollector, parse_pos_list
+
+
+def legacy_parse_pos_list(raw_geometry):
+    """The original reader: one float() and one tuple per coordinate"""
+    geometry_parts = iter(raw_geometry.split(" "))
+
+    geometry = []
+
+    for geo in geometry_parts:
+        x = float(geo)
+        y = float(next(geometry_parts))
+        geometry.append((x, y))
+
+    return geometry
+
+
+def generate_pos_lists(count: int, points: int, seed: int = 1) -> list[str]:
+    rnd = random.Random(seed)
+    pos_lists = []
+    for _ in range(count):
+        coords = [(50 + rnd.random(), 8 + rnd.random()) for _ in range(points)]
+        coords.append(coords[0])
+        pos_lists.append(" ".join(f"{lat} {lon}" for lat, lon in coords))
+
+    return pos_lists
+
+
+def run_legacy(pos_lists: list[str]) -> list:
+    geometries = []
+    for raw in pos_lists:
+        poslist = legacy_parse_pos_list(raw)
+        if len(poslist) > 2:
+            geometries.append(LinearRing(poslist))
+        else:
+            geometries.append(LineString(poslist))
+
+    return geometries
+
+
+def run_bulk(pos_lists: list[str]) -> list:
+    feature = SimpleNamespace(geometries=[])
+    collector = GeometryCollector()
+    collector.add(feature, [parse_pos_list(raw) for raw in pos_lists], True)
+    collector.build()
+    return feature.geometries
+
+
+def main() -> None:
+    argp = argparse.ArgumentParser(description=__doc__)
+    argp.add_argument("--count", type=int, default=20000, help="Number of posLists")
+    argp.add_argument("--points", type=int, default=20, help="Points per posList")
+    argp.add_argument("--repeat", type=int, default=5, help="Number of timing repetitions")
+    args = argp.parse_args()
+
+    pos_lists = generate_pos_lists(args.count, args.points)
+
+    legacy = run_legacy(pos_lists)
+    bulk = run_bulk(pos_lists)
+    assert all(a.equals_exact(b, 0) for a, b in zip(legacy, bulk, strict=True))
+
+    for name, func in (("legacy", run_legacy), ("bulk", run_bulk)):
+        best = min(timeit.repeat(lambda f=func: f(pos_lists), number=1, repeat=args.repeat))
+        print(f"{name:>8}: {best * 1000:9.1f} ms for {args.count} posLists")
+
+
+if __name__ == "__main__":
+    main()
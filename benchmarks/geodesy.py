@@ -0,0 +1,63 @@
+"""Measures the speed and the maximum error of the geodesy models against the exact model"""
+
+import argparse
+import timeit
+
+import numpy as np
+
+from mapbuilder.utils import geodesy
+from mapbuilder.utils.geo import NM_IN_METERS
+
+
+def generate_moves(count: int, max_dist: float, seed: int = 1) -> tuple[np.ndarray, ...]:
+    """Random moves of up to max_dist nautical miles (in either direction) around Europe"""
+    rng = np.random.default_rng(seed)
+    return (
+        rng.uniform(35, 70, count),
+        rng.uniform(-10, 30, count),
+        rng.uniform(-max_dist, max_dist, count) * NM_IN_METERS,
+        rng.uniform(0, 360, count),
+    )
+
+
+def distance_error(lats1, lons1, lats2, lons2) -> np.ndarray:
+    """Haversine distance in meters, precise enough for the small deviations measured here"""
+    phi1, phi2 = np.radians(lats1), np.radians(lats2)
+    h = (
+        np.sin((phi2 - phi1) / 2) ** 2
+        + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lons2 - lons1) / 2) ** 2
+    )
+    return 2 * geodesy.MEAN_RADIUS * np.arcsin(np.sqrt(h))
+
+
+def main() -> None:
+    argp = argparse.ArgumentParser(description=__doc__)
+    argp.add_argument("--count", type=int, default=200, help="Number of destinations")
+    argp.add_argument("--max-dist", type=float, default=200, help="Maximum distance in NM")
+    argp.add_argument("--repeat", type=int, default=3, help="Number of timing repetitions")
+    args = argp.parse_args()
+
+    moves = generate_moves(args.count, args.max_dist)
+    reference = geodesy.destination_arrays(*moves, model="exact")
+    distances = np.abs(moves[2])
+
+    for model in geodesy.MODELS:
+        lats, lons = geodesy.destination_arrays(*moves, model=model)
+        error = distance_error(*reference, lats, lons)
+        relative = np.max(error / np.maximum(distances, 1))
+
+        best = min(
+            timeit.repeat(
+                lambda m=model: geodesy.destination_arrays(*moves, model=m),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        print(
+            f"{model:>10}: {best * 1000:9.2f} ms for {args.count} destinations, "
+            f"max error {np.max(error):.3g} m ({relative * 100:.3g} % of the distance)",
+        )
+
+
+if __name__ == "__main__":
+    main()
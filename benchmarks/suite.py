@@ -0,0 +1,247 @@
+"""Times the stages of a map build separately on synthetic inputs at several scales.
+
+Results are written as JSON. Given a baseline from an earlier run, stages that got slower than
+the threshold allows are reported as regressions and the run fails:
+
+    python -m benchmarks --output baseline.json
+    python -m benchmarks --compare baseline.json
+"""
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import NamedTuple
+
+from benchmarks.synthetic import write_aixm, write_ese, write_kml, write_sct, write_sectors
+from mapbuilder.data.aixm2 import parse_aixm
+from mapbuilder.data.kml import KMLParser, parse_kml
+from mapbuilder.data.rwy import parse_runway
+from mapbuilder.data.sectors import parse_sectors, sectors_to_lines
+from mapbuilder.data.sidstar import parse_sidstar
+from mapbuilder.handlers.jinja import JinjaHandler
+from mapbuilder.utils import memo
+from mapbuilder.writer import FragmentWriter, atomic_open
+
+RESULTS_VERSION = 1
+DEFAULT_THRESHOLD = 0.2
+
+
+class Scale(NamedTuple):
+    aixm_features: int
+    kml_folders: int
+    kml_placemarks: int
+    airports: int
+    procedures: int
+    firs: int
+    sectors: int
+    targets: int
+
+
+SCALES = {
+    "small": Scale(200, 5, 100, 20, 20, 2, 10, 4),
+    "medium": Scale(2000, 20, 250, 100, 40, 4, 25, 10),
+    "large": Scale(10000, 50, 500, 400, 60, 8, 50, 20),
+}
+
+# Renders every data source the way map templates usually do. Runway extensions are limited to
+# a few airports, they are dominated by the geodesy model which has its own benchmark.
+TEMPLATE = """\
+{{ data.ad.ApronElement.values() | list | geoms | to_poly("aprons", "APRON") }}
+{{ combine(data.ad.ApronElement.values() | list | geoms) | to_poly("combined", "C") }}
+{% for k, v in data.ad.ApronElementByApron.items() %}{{ v | to_coordline(k) }}{% endfor %}
+{{ data.ad.GuidanceLine.values() | list | geoms | join_segments | simplify(0.00001)
+    | to_line("gl") }}
+{{ data.ad.TaxiwayElement.values() | list | filter_smaller_than(0.0001) | to_line("te") }}
+{% for k, v in data.ad.TaxiwayMarkingByDesig.items() %}{{ v | to_line(k) }}{% endfor %}
+{% for folder in data.kml.values() %}{% for k, v in folder.items() %}{{ v | to_line(k) }}
+{% endfor %}{% endfor %}
+{% for icao, ad in data.sct.RUNWAY.items() %}{{ render_cl(ad) }}
+{% if loop.index <= 5 %}{{ render_runways(ad) }}
+{% endif %}{% endfor %}
+{% for icao, runways in data.ese.SIDSTAR.SID.items() %}{% for rwy, procs in runways.items() %}
+{% for name, wpts in procs.items() %}{{ render_sid(wpts, {}) }}
+{% endfor %}{% endfor %}{% endfor %}
+{% for fir in data.sect.lines.values() %}{% for sector in fir.values() %}
+{{ render_sectorlines(*sector.values()) }}
+{% endfor %}{% endfor %}
+"""
+
+
+class Stage(NamedTuple):
+    name: str
+    run: Callable[[dict], object]
+
+
+def _render(workspace: dict) -> str:
+    # Start from empty caches, a build renders each map once
+    memo.clear()
+    return JinjaHandler(workspace["data"], {"runways": {}}).handle(workspace["template"])
+
+
+def _write(workspace: dict) -> None:
+    fragments = workspace["output"].split("\n\n")
+    for idx in range(workspace["scale"].targets):
+        with atomic_open(workspace["target_dir"] / f"target-{idx}.txt", "iso-8859-1") as f:
+            writer = FragmentWriter(f)
+            for fragment in fragments:
+                writer.append(fragment)
+
+
+STAGES = [
+    Stage("parse_aixm", lambda ws: parse_aixm(ws["aixm"])),
+    Stage("KMLParser", lambda ws: KMLParser(ws["kml"], "Top").parse()),
+    Stage("parse_kml", lambda ws: parse_kml(ws["kml"], "Top")),
+    Stage("parse_runway", lambda ws: parse_runway(ws["sct"])),
+    Stage("parse_sidstar", lambda ws: parse_sidstar(ws["ese"])),
+    Stage("parse_sectors", lambda ws: sectors_to_lines(parse_sectors(ws["sectors"]))),
+    Stage("render", _render),
+    Stage("write", _write),
+]
+
+
+def prepare(directory: Path, scale: Scale) -> dict:
+    """Writes the synthetic inputs of a scale, loads them and renders the template once"""
+    workspace = {
+        "scale": scale,
+        "aixm": write_aixm(directory / "ad.aixm", scale.aixm_features),
+        "kml": write_kml(directory / "a.kml", scale.kml_folders, scale.kml_placemarks),
+        "sct": write_sct(directory / "a.sct", scale.airports),
+        "ese": write_ese(directory / "a.ese", scale.airports, scale.procedures),
+        "sectors": write_sectors(directory / "sectors.txt", scale.firs, scale.sectors),
+        "template": directory / "maps" / "bench.jinja",
+        "target_dir": directory / "out",
+    }
+    workspace["template"].parent.mkdir()
+    workspace["template"].write_text(TEMPLATE, encoding="utf-8")
+    workspace["target_dir"].mkdir()
+
+    sectors = parse_sectors(workspace["sectors"])
+    workspace["data"] = {
+        "ad": parse_aixm(workspace["aixm"]),
+        "kml": parse_kml(workspace["kml"], "Top"),
+        "sct": {"RUNWAY": parse_runway(workspace["sct"])},
+        "ese": {"SIDSTAR": parse_sidstar(workspace["ese"])},
+        "sect": {"fixes": sectors, "lines": sectors_to_lines(sectors)},
+    }
+    workspace["output"] = _render(workspace)
+    return workspace
+
+
+def measure(stage: Stage, workspace: dict, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        stage.run(workspace)
+        times.append(time.perf_counter() - start)
+
+    return {"best": min(times), "median": statistics.median(times), "repeat": repeat}
+
+
+def run(scales: list[str], stages: list[str] | None, repeat: int) -> dict:
+    results = {}
+    for scale_name in scales:
+        with tempfile.TemporaryDirectory() as tempdir:
+            workspace = prepare(Path(tempdir), SCALES[scale_name])
+            results[scale_name] = {}
+
+            for stage in STAGES:
+                if stages is not None and stage.name not in stages:
+                    continue
+
+                result = measure(stage, workspace, repeat)
+                results[scale_name][stage.name] = result
+                print(
+                    f"{scale_name:>8} {stage.name:>14}: {result['best'] * 1000:10.1f} ms "
+                    f"(median {result['median'] * 1000:.1f} ms)",
+                )
+
+    return {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Prints the change of every stage measured in both runs, returns the regressed ones"""
+    if baseline.get("version") != RESULTS_VERSION:
+        msg = f"Unsupported baseline version {baseline.get('version')}"
+        raise ValueError(msg)
+
+    regressions = []
+    for scale_name, stages in results["results"].items():
+        for stage_name, result in stages.items():
+            reference = baseline["results"].get(scale_name, {}).get(stage_name)
+            if reference is None:
+                continue
+
+            ratio = result["best"] / max(reference["best"], 1e-9)
+            regressed = ratio > 1 + threshold
+            print(
+                f"{scale_name:>8} {stage_name:>14}: {reference['best'] * 1000:10.1f} ms -> "
+                f"{result['best'] * 1000:10.1f} ms ({(ratio - 1) * 100:+6.1f} %)"
+                + ("  REGRESSION" if regressed else ""),
+            )
+            if regressed:
+                regressions.append(f"{scale_name}/{stage_name}")
+
+    return regressions
+
+
+def main() -> None:
+    argp = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    argp.add_argument(
+        "--scale",
+        action="append",
+        choices=SCALES,
+        help="Scale to run, may be repeated (default: small and medium)",
+    )
+    argp.add_argument(
+        "--stage",
+        action="append",
+        choices=[stage.name for stage in STAGES],
+        help="Stage to run, may be repeated (default: all)",
+    )
+    argp.add_argument("--repeat", type=int, default=3, help="Number of timing repetitions")
+    argp.add_argument("--output", type=Path, help="Write the results to this JSON file")
+    argp.add_argument("--compare", type=Path, help="Baseline JSON file to compare against")
+    argp.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Relative slowdown reported as a regression (default: %(default)s)",
+    )
+    args = argp.parse_args()
+
+    results = run(args.scale or ["small", "medium"], args.stage, args.repeat)
+
+    if args.output is not None:
+        with args.output.open("w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare is not None:
+        with args.compare.open(encoding="utf-8") as f:
+            baseline = json.load(f)
+
+        print(f"\nCompared to {args.compare}:")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""Generators for synthetic input files"""
+
+import math
+import random
+from pathlib import Path
+
+AIXM_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<message:AIXMBasicMessage xmlns:message="http://www.aixm.aero/schema/5.1.1/message" '
+    'xmlns:gml="http://www.opengis.net/gml/3.2" xmlns:aixm="http://www.aixm.aero/schema/5.1.1" '
+    'xmlns:xlink="http://www.w3.org/1999/xlink" gml:id="msg">\n'
+)
+AIXM_FOOTER = "</message:AIXMBasicMessage>\n"
+
+
+def _ring(rnd: random.Random, points: int) -> str:
+    lat, lon = 50 + rnd.random(), 8 + rnd.random()
+    coords = [
+        (
+            lat + 0.001 * math.cos(2 * math.pi * k / points),
+            lon + 0.001 * math.sin(2 * math.pi * k / points),
+        )
+        for k in range(points)
+    ]
+    coords.append(coords[0])
+    return " ".join(f"{a} {b}" for a, b in coords)
+
+
+def _line(rnd: random.Random, points: int) -> str:
+    lat, lon = 50 + rnd.random(), 8 + rnd.random()
+    return " ".join(f"{lat + 0.0002 * k} {lon + 0.0003 * k * rnd.random()}" for k in range(points))
+
+
+def _member(feature: str, uid: str, content: str) -> str:
+    return (
+        f'<message:hasMember><aixm:{feature} gml:id="id-{uid}">'
+        f'<gml:identifier codeSpace="urn:uuid:">{uid}</gml:identifier>'
+        f'<aixm:timeSlice><aixm:{feature}TimeSlice gml:id="ts-{uid}">'
+        f"<gml:validTime/><aixm:interpretation>BASELINE</aixm:interpretation>{content}"
+        f"</aixm:{feature}TimeSlice></aixm:timeSlice></aixm:{feature}></message:hasMember>\n"
+    )
+
+
+def _surface(pos_list: str) -> str:
+    return (
+        "<aixm:extent><aixm:ElevatedSurface><gml:patches><gml:PolygonPatch><gml:exterior>"
+        f"<gml:LinearRing><gml:posList>{pos_list}</gml:posList></gml:LinearRing>"
+        "</gml:exterior></gml:PolygonPatch></gml:patches></aixm:ElevatedSurface></aixm:extent>"
+    )
+
+
+def _curve(pos_list: str) -> str:
+    return (
+        "<aixm:extent><aixm:ElevatedCurve><gml:segments><gml:LineStringSegment>"
+        f"<gml:posList>{pos_list}</gml:posList>"
+        "</gml:LineStringSegment></gml:segments></aixm:ElevatedCurve></aixm:extent>"
+    )
+
+
+def write_aixm(path: Path, features: int, points: int = 12, seed: int = 1) -> Path:
+    """Writes an AIXM 5.1.1 message with the given number of apron elements, taxiway elements,
+    guidance lines, vertical structures and taxiway markings each."""
+    rnd = random.Random(seed)
+    aprons = max(1, features // 50)
+    taxiways = max(1, features // 20)
+
+    with path.open("w", encoding="utf-8") as f:
+        f.write(AIXM_HEADER)
+
+        for idx in range(aprons):
+            f.write(
+                _member(
+                    "Apron",
+                    f"apn-{idx}",
+                    f"<aixm:name>APRON {idx}</aixm:name><aixm:surfaceProperties>"
+                    "<aixm:SurfaceCharacteristics><aixm:composition>ASPH</aixm:composition>"
+                    "</aixm:SurfaceCharacteristics></aixm:surfaceProperties>"
+                    "<aixm:abandoned>NO</aixm:abandoned>",
+                )
+            )
+
+        for idx in range(taxiways):
+            f.write(
+                _member(
+                    "Taxiway",
+                    f"twy-{idx}",
+                    f"<aixm:designator>T{idx}</aixm:designator><aixm:type>TAXIWAY</aixm:type>"
+                    '<aixm:width uom="M">23</aixm:width><aixm:abandoned>NO</aixm:abandoned>',
+                )
+            )
+
+        for idx in range(features):
+            f.write(
+                _member(
+                    "ApronElement",
+                    f"ae-{idx}",
+                    "<aixm:type>NORMAL</aixm:type>"
+                    f'<aixm:associatedApron xlink:href="urn:uuid:apn-{idx % aprons}"/>'
+                    + _surface(_ring(rnd, points)),
+                )
+            )
+            f.write(
+                _member(
+                    "TaxiwayElement",
+                    f"te-{idx}",
+                    "<aixm:type>NORMAL</aixm:type>"
+                    f'<aixm:associatedTaxiway xlink:href="urn:uuid:twy-{idx % taxiways}"/>'
+                    + _surface(_ring(rnd, points)),
+                )
+            )
+            f.write(
+                _member(
+                    "GuidanceLine",
+                    f"gl-{idx}",
+                    f"<aixm:designator>T{idx % taxiways}</aixm:designator>"
+                    "<aixm:type>TWY</aixm:type>" + _curve(_line(rnd, points)),
+                )
+            )
+            f.write(
+                _member(
+                    "VerticalStructure",
+                    f"vs-{idx}",
+                    f"<aixm:name>BUILDING {idx % 97}</aixm:name><aixm:type>BUILDING</aixm:type>"
+                    "<aixm:part><aixm:VerticalStructurePart><aixm:horizontalProjection_surface>"
+                    f"<aixm:ElevatedSurface><gml:patches><gml:PolygonPatch><gml:exterior>"
+                    f"<gml:LinearRing><gml:posList>{_ring(rnd, points)}</gml:posList>"
+                    "</gml:LinearRing></gml:exterior></gml:PolygonPatch></gml:patches>"
+                    "</aixm:ElevatedSurface></aixm:horizontalProjection_surface>"
+                    "</aixm:VerticalStructurePart></aixm:part>",
+                )
+            )
+            f.write(
+                _member(
+                    "TaxiwayMarking",
+                    f"tm-{idx}",
+                    "<aixm:markingLocation>TWY_EDGE</aixm:markingLocation>"
+                    f'<aixm:markedTaxiway xlink:href="urn:uuid:twy-{idx % taxiways}"/>'
+                    "<aixm:element><aixm:MarkingElement><aixm:colour>YELLOW</aixm:colour>"
+                    "<aixm:style>SOLID</aixm:style>"
+                    "<aixm:extent_curveExtent>"
+                    f"{_curve(_line(rnd, points))}"
+                    "</aixm:extent_curveExtent>"
+                    "</aixm:MarkingElement></aixm:element>",
+                )
+            )
+
+        f.write(AIXM_FOOTER)
+
+    return path
+
+
+def _icao(idx: int) -> str:
+    """A four letter location indicator, ED.. first"""
+    letters = ""
+    for _ in range(3):
+        idx, rest = divmod(idx, 26)
+        letters = chr(ord("A") + rest) + letters
+    return f"E{letters}"
+
+
+def _es_coords(lat: float, lon: float) -> str:
+    """Formats a position like the SCT and sector files, e.g. N050.01.59.000 E008.34.14.000"""
+    parts = []
+    for value, hemispheres in ((lat, "NS"), (lon, "EW")):
+        hemisphere = hemispheres[0] if value >= 0 else hemispheres[1]
+        seconds = round(abs(value) * 3600, 3)
+        degrees, seconds = divmod(seconds, 3600)
+        minutes, seconds = divmod(seconds, 60)
+        parts.append(f"{hemisphere}{int(degrees):03d}.{int(minutes):02d}.{seconds:06.3f}")
+    return " ".join(parts)
+
+
+def write_kml(path: Path, folders: int, placemarks: int, points: int = 12, seed: int = 1) -> Path:
+    """Writes a KML document with a root folder "Top" holding the given number of folders, each
+    with placemarks lines, polygons and points in turn. Placemark names repeat within a folder."""
+    rnd = random.Random(seed)
+
+    with path.open("w", encoding="utf-8") as f:
+        f.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<kml xmlns="http://www.opengis.net/kml/2.2"><Document><Folder><name>Top</name>\n',
+        )
+
+        for folder in range(folders):
+            f.write(f"<Folder><name>F{folder}</name>\n")
+
+            for idx in range(placemarks):
+                lat, lon = 50 + rnd.random(), 8 + rnd.random()
+                if idx % 3 == 0:
+                    coords = " ".join(
+                        f"{lon + 0.0003 * k * rnd.random()},{lat + 0.0002 * k},0"
+                        for k in range(points)
+                    )
+                    geometry = f"<LineString><coordinates>{coords}</coordinates></LineString>"
+                elif idx % 3 == 1:
+                    ring = [
+                        (
+                            lon + 0.001 * math.sin(2 * math.pi * k / points),
+                            lat + 0.001 * math.cos(2 * math.pi * k / points),
+                        )
+                        for k in range(points)
+                    ]
+                    ring.append(ring[0])
+                    coords = " ".join(f"{a},{b},0" for a, b in ring)
+                    geometry = (
+                        "<Polygon><outerBoundaryIs><LinearRing>"
+                        f"<coordinates>{coords}</coordinates>"
+                        "</LinearRing></outerBoundaryIs></Polygon>"
+                    )
+                else:
+                    geometry = f"<Point><coordinates>{lon},{lat},0</coordinates></Point>"
+
+                f.write(f"<Placemark><name>P{idx % 50}</name>{geometry}</Placemark>\n")
+
+            f.write("</Folder>\n")
+
+        f.write("</Folder></Document></kml>\n")
+
+    return path
+
+
+def write_sct(path: Path, airports: int, runways: int = 2, seed: int = 1) -> Path:
+    """Writes the [AIRPORT] and [RUNWAY] sections of an SCT file with the given number of
+    airports, each with parallel runways"""
+    rnd = random.Random(seed)
+    centers = [(45 + 10 * rnd.random(), 10 * rnd.random()) for _ in range(airports)]
+
+    with path.open("w", encoding="iso-8859-1") as f:
+        f.write("[AIRPORT]\n")
+        for idx, (lat, lon) in enumerate(centers):
+            f.write(f"{_icao(idx)} 118.{idx % 1000:03d} {_es_coords(lat, lon)} D\n")
+
+        f.write("\n[RUNWAY]\n")
+        for idx, (lat, lon) in enumerate(centers):
+            bearing = rnd.randrange(10, 170)
+            dlat = 0.015 * math.cos(math.radians(bearing))
+            dlon = 0.015 * math.sin(math.radians(bearing)) / math.cos(math.radians(lat))
+            for rwy in range(runways):
+                offset = 0.004 * (rwy - (runways - 1) / 2)
+                designator = round(bearing / 10) or 36
+                suffix = "LCR"[rwy % 3] if runways > 1 else ""
+                opposite = "RCL"[rwy % 3] if runways > 1 else ""
+                f.write(
+                    f"{designator:02d}{suffix} {designator + 18:02d}{opposite} "
+                    f"{bearing:03d} {bearing + 180:03d} "
+                    f"{_es_coords(lat - dlat + offset, lon - dlon)} "
+                    f"{_es_coords(lat + dlat + offset, lon + dlon)} {_icao(idx)}\n",
+                )
+
+    return path
+
+
+def write_ese(path: Path, airports: int, procedures: int = 20, fixes: int = 5) -> Path:
+    """Writes a [SIDSSTARS] section with the given number of SIDs and STARs per airport"""
+    with path.open("w", encoding="iso-8859-1") as f:
+        f.write("[SIDSSTARS]\n")
+        for idx in range(airports):
+            icao = _icao(idx)
+            for proc in range(procedures):
+                kind = "SID" if proc % 2 == 0 else "STAR"
+                route = " ".join(f"{icao[1:]}{(proc + k) % 1000:03d}" for k in range(fixes))
+                f.write(f"{kind}:{icao}:{1 + proc % 2:02d}:P{proc:04d}:{route}\n")
+
+    return path
+
+
+def write_sectors(
+    path: Path,
+    firs: int,
+    sectors: int,
+    bands: int = 2,
+    points: int = 40,
+    seed: int = 1,
+) -> Path:
+    """Writes a sector file with the given number of sectors per FIR, each with level bands
+    made of polygons with the given number of points"""
+    rnd = random.Random(seed)
+
+    with path.open("w", encoding="utf-8") as f:
+        for fir in range(firs):
+            for sector in range(sectors):
+                lat, lon = 45 + 10 * rnd.random(), 10 * rnd.random()
+                for band in range(bands):
+                    lower, upper = band * 100, band * 100 + 95
+                    for k in range(points):
+                        angle = 2 * math.pi * k / points
+                        coords = _es_coords(
+                            lat + 0.5 * math.cos(angle),
+                            lon + 0.7 * math.sin(angle),
+                        )
+                        f.write(f"{_icao(fir)}·SEC {sector}·{lower:03d}·{upper:03d} {coords} x y\n")
+
+    return path
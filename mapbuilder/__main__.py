@@ -6,30 +6,141 @@ from pathlib import Path
 
 from rich.logging import RichHandler
 
+from . import profiling
 from .builder import Builder
+from .loader import DataSourceError
+from .utils import geodesy
+
+COMMANDS = ["build", "prefetch", "watch"]
 
 
 def main(prog_name: str, *argv: str) -> int:
-    argp = argparse.ArgumentParser(
-        prog=Path(prog_name).name,
-        usage="%(prog)s [options] target_dir",
-    )
-    argp.add_argument("target_dir", type=Path, help="Target directory")
-    argp.add_argument(
+    # Without a command, the arguments are those of build
+    if not argv or argv[0] not in [*COMMANDS, "-h", "--help"]:
+        argv = ("build", *argv)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("target_dir", type=Path, help="Target directory")
+    common.add_argument(
         "-s",
         "--source",
         type=Path,
         default=Path(),
         help="Source directory (default: current directory)",
     )
-    argp.add_argument(
+    common.add_argument(
         "-c",
         "--cache",
         type=Path,
         default=None,
         help="Cache directory for downloaded resources (default: .cache in target directory)",
     )
-    argp.add_argument("--debug", action="store_true", help="Enable debug output")
+    common.add_argument(
+        "--fetch-workers",
+        type=int,
+        default=4,
+        help="Number of concurrent downloads when fetching remote sources (default: 4)",
+    )
+    common.add_argument(
+        "--profile-out",
+        type=Path,
+        metavar="FILE",
+        help="Record the time and peak memory of data source loads, fetches, map items and "
+        "target writes and write them to FILE as Chrome trace-event JSON. Tracing memory "
+        "slows the build down considerably",
+    )
+    common.add_argument(
+        "--profile-top",
+        type=int,
+        default=profiling.DEFAULT_TOP,
+        metavar="N",
+        help="Number of slowest spans per category summarized with --profile-out "
+        "(default: %(default)s)",
+    )
+    common.add_argument("--debug", action="store_true", help="Enable debug output")
+
+    building = argparse.ArgumentParser(add_help=False)
+    building.add_argument(
+        "-p",
+        "--profile",
+        action="append",
+        dest="profiles",
+        metavar="PROFILE",
+        help="Only build the given profile (may be given multiple times)",
+    )
+    building.add_argument(
+        "-m",
+        "--map",
+        action="append",
+        dest="maps",
+        metavar="MAP",
+        help="Only build the given map (may be given multiple times)",
+    )
+    building.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes building maps in parallel (default: 1)",
+    )
+    building.add_argument(
+        "--load-workers",
+        type=int,
+        default=1,
+        help="Number of workers loading data sources concurrently. More than one worker loads "
+        "the data sources the maps used in their last build (all on the first build) up front "
+        "instead of on first use (default: 1)",
+    )
+    building.add_argument(
+        "--load-executor",
+        choices=["thread", "process"],
+        default="thread",
+        help="Worker type used for loading data sources (default: thread)",
+    )
+
+    argp = argparse.ArgumentParser(
+        prog=Path(prog_name).name,
+        description="Builds the maps of all profiles. Without a command, the arguments are "
+        "those of build.",
+    )
+    commands = argp.add_subparsers(dest="command", metavar="command")
+
+    build = commands.add_parser(
+        "build",
+        parents=[common, building],
+        help="Build the maps of all profiles (default)",
+    )
+    build.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="Rebuild all targets, even if their inputs did not change",
+    )
+    build.add_argument(
+        "--no-prefetch",
+        action="store_true",
+        help="Do not download the remote sources of outdated maps before building, fetch them "
+        "on first use",
+    )
+
+    prefetch = commands.add_parser(
+        "prefetch",
+        parents=[common],
+        help="Only download all remote data sources into the cache",
+    )
+    prefetch.set_defaults(profiles=None, maps=None, load_workers=1, load_executor="thread")
+
+    watch = commands.add_parser(
+        "watch",
+        parents=[common, building],
+        help="Keep rebuilding the maps affected by changes to the source directory",
+    )
+    watch.add_argument(
+        "--interval",
+        type=float,
+        default=1.0,
+        help="Seconds between checks for changes (default: %(default)s)",
+    )
 
     args = argp.parse_args(argv)
 
@@ -46,12 +157,73 @@ def main(prog_name: str, *argv: str) -> int:
     with config_file.open(mode="rb") as cfh:
         config = tomllib.load(cfh)
 
+    geodesy_model = config.get("geodesy", {}).get("model", geodesy.DEFAULT_MODEL)
+    if geodesy_model not in geodesy.MODELS:
+        argp.error(
+            f"Unknown geodesy model {geodesy_model}, expected one of {', '.join(geodesy.MODELS)}",
+        )
+
+    for profile in args.profiles or []:
+        if profile not in config["profiles"]:
+            argp.error(f"Unknown profile {profile}")
+
+    known_maps = {
+        map_data["map"] for profile in config["profiles"].values() for map_data in profile["maps"]
+    }
+    for map_id in args.maps or []:
+        if map_id not in known_maps:
+            argp.error(f"Unknown map {map_id}")
+
     cache = args.target_dir / ".cache" if args.cache is None else args.cache
 
+    if args.profile_out is not None:
+        profiling.enable()
+
+    try:
+        return run(args.command, args, config, cache)
+    finally:
+        if args.profile_out is not None:
+            profiling.write(args.profile_out)
+            for line in profiling.summary(args.profile_top):
+                logging.info(line)
+            logging.info(f"Profile written to {args.profile_out}")
+
+
+def run(command: str, args: argparse.Namespace, config: dict, cache: Path) -> int:
     logging.debug(config)
-    builder = Builder(args.source, args.target_dir, cache, config)
-    builder.build()
-    return 0
+    builder = Builder(
+        args.source,
+        args.target_dir,
+        cache,
+        config,
+        load_workers=args.load_workers,
+        load_executor=args.load_executor,
+        fetch_workers=args.fetch_workers,
+    )
+
+    if command == "prefetch":
+        return 0 if builder.prefetch() else 1
+
+    if command == "watch":
+        try:
+            builder.watch(args.jobs, args.profiles, args.maps, args.interval)
+        except KeyboardInterrupt:
+            logging.info("Stopped watching.")
+        return 0
+
+    try:
+        success = builder.build(
+            args.jobs,
+            args.profiles,
+            args.maps,
+            args.force,
+            prefetch=not args.no_prefetch,
+        )
+    except DataSourceError as e:
+        logging.error(e)  # noqa: TRY400
+        return 1
+
+    return 0 if success else 1
 
 
 def entry() -> None:
@@ -1,113 +1,429 @@
+import functools
 import logging
+import multiprocessing
+import threading
+import time
+import traceback
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import UTC, datetime
 from pathlib import Path
 
+from . import profiling
 from .cache import Cache
-from .data.aixm2 import parse_aixm
-from .data.kml import KMLParser
-from .data.rwy import parse_runway
-from .data.sectors import parse_sectors, sectors_to_lines
-from .data.sidstar import parse_sidstar
 from .dfs import datasets
 from .handlers.jinja import JinjaHandler
 from .handlers.plaintext import PlainTextHandler
-from .utils.geojson import load_geojson
-from .utils.geopackage import load_geopackage
+from .loader import DataSources, ParallelLoader
+from .manifest import MANIFEST_FILE, MANIFEST_VERSION, PACKAGE_VERSION, Manifest, fingerprint
+from .utils import geodesy, memo
+from .writer import FragmentWriter, atomic_open
 
 SUFFIXES = [".txt", ".jinja"]
+# Data source types whose source may be a remote (http or dfs:) location
+REMOTE_TYPES = ["aixm", "geojson"]
+# Hours after which downloaded http sources are revalidated
+REMOTE_TTL = 96
+
+# The builder used by forked worker processes of a parallel build
+_worker_builder: "Builder | None" = None
 
 
 class Builder:
-    def __init__(self, source_dir, target_dir, cache_dir, config):
+    def __init__(
+        self,
+        source_dir,
+        target_dir,
+        cache_dir,
+        config,
+        load_workers: int = 1,
+        load_executor: str = "thread",
+        fetch_workers: int = 4,
+    ):
         self.source_dir = source_dir
         self.target_dir = target_dir
         self.cache = Cache(cache_dir)
         self.config = config
 
-        self.data = {}
+        geodesy_config = config.get("geodesy", {})
+        geodesy.set_model(geodesy_config.get("model", geodesy.DEFAULT_MODEL))
+        geodesy.set_cache_size(geodesy_config.get("cache_size", geodesy.DEFAULT_CACHE_SIZE))
+        self.geodesy_cache_file = (
+            self.cache.cache_location / "geodesy-cache"
+            if geodesy_config.get("persist", False)
+            else None
+        )
+        if self.geodesy_cache_file is not None:
+            geodesy.load_cache(self.geodesy_cache_file)
+
         self.dfs_datasets = None
-        for data_source in config["data"]:
-            data_source_type = config["data"][data_source]["type"]
-            if data_source_type == "aixm":
-                logging.debug(f"Loading AIXM source {data_source}...")
-
-                src = self.__load(data_source, config["data"][data_source]["source"])
-                if src is not None:
-                    self.data[data_source] = parse_aixm(src)
-            elif data_source_type == "kml":
-                logging.debug(f"Loading KML source {data_source}...")
-                data_root = None
-                if "root" in config["data"][data_source]:
-                    data_root = config["data"][data_source]["root"]
-                parser = KMLParser(
-                    source_dir / config["data"][data_source]["source"], data_root
-                )
-                self.data[data_source] = parser.parse()
-            elif data_source_type == "raw":
-                logging.debug(f"Loading raw source {data_source}...")
-                with (source_dir / config["data"][data_source]["source"]).open(
-                        encoding="iso-8859-1",
-                ) as f:
-                    self.data[data_source] = f.read()
-            elif data_source_type == "ese":
-                logging.debug(f"Loading ESE source {data_source}...")
-                self.data[data_source] = {
-                    "SIDSTAR": parse_sidstar(
-                        source_dir / config["data"][data_source]["source"]
-                    ),
-                }
-            elif data_source_type == "sct":
-                logging.debug(f"Loading SCT source {data_source}...")
-                self.data[data_source] = {
-                    "RUNWAY": parse_runway(
-                        source_dir / config["data"][data_source]["source"]
-                    ),
-                }
-            elif data_source_type == "sectors":
-                logging.debug(f"Loading sectors source {data_source}...")
-                fixes = parse_sectors(source_dir / config["data"][data_source]["source"])
-                self.data[data_source] = {
-                    "fixes": fixes,
-                    "lines": sectors_to_lines(fixes),
-                }
-            elif data_source_type == "gpkg":
-                logging.debug(f"Loading GeoPackage source {data_source}...")
-                self.data[data_source] = load_geopackage(
-                    source_dir / config["data"][data_source]["source"],
-                    config["data"][data_source]["layers"]
-                )
-            elif data_source_type == "geojson":
-                logging.debug(f"Loading GeoJSON source {data_source}...")
+        self.dfs_lock = threading.Lock()
+        self.data_fingerprints = {}
+        self.fetch_workers = fetch_workers
 
-                src = self.__load(data_source, config["data"][data_source]["source"])
-                if src is not None:
-                    self.data[data_source] = load_geojson(src)
-            else:
-                logging.error(f"Unknown data source type for data source {data_source}")
+        self.loader = ParallelLoader(load_workers, load_executor, self.cache.cache_location)
+        self.data = DataSources(config["data"], self.__resolve, self.cache.cache_location)
+
+        self.jinja_handler = JinjaHandler(
+            self.data,
+            self.config,
+            self.cache.cache_location / "jinja",
+        )
+
+    def __resolve(self, name: str, source_config: dict) -> Path | None:
+        """Determines the path of a data source, fetching remote sources if supported"""
+        if source_config["type"] in REMOTE_TYPES:
+            return self.__load(name, source_config["source"])
 
-        self.jinja_handler = JinjaHandler(self.data, self.config)
+        return self.source_dir / source_config["source"]
 
     def __load(self, name: str, src: str):
         if src.startswith("dfs:"):
             _, amdt, leaf, data_format = src.split(":")
             amdt_id = int(amdt)
 
-            if self.dfs_datasets is None:
-                self.dfs_datasets = datasets.get_dfs_datasets(self.cache)
-
-            url = datasets.get_dfs_url(self.dfs_datasets[amdt_id], amdt_id, leaf, data_format)
-            if url is None:
+            release = datasets.get_dfs_release(
+                self.__dfs_datasets().get(amdt_id, {}), leaf, data_format
+            )
+            if release is None:
                 logging.error(f"Cannot get source URL for DFS dataset {name}")
                 return None
-            return self.cache.get(f"dfs-{name}", url, 96)
+            with profiling.span(f"fetch {name}", "fetch", source=src):
+                return self.cache.get(
+                    f"dfs-{name}",
+                    datasets.get_release_url(amdt_id, release),
+                    REMOTE_TTL,
+                    release.checksum,
+                )
         if src.startswith("http"):
-            return self.cache.get(f"remote-{name}", src, 96)
+            with profiling.span(f"fetch {name}", "fetch", source=src):
+                return self.cache.get(f"remote-{name}", src, REMOTE_TTL)
         else:
             return self.source_dir / src
 
-    def build(self):
-        for profile in self.config["profiles"]:
-            self.build_profile(profile)
+    def __cached_source(self, name: str, source_config: dict) -> Path | None:
+        """Determines the path of a data source without fetching anything. Remote sources are
+        looked up in the cache, None is returned for those not downloaded yet."""
+        src = source_config["source"]
+        if source_config["type"] in REMOTE_TYPES:
+            if src.startswith("dfs:"):
+                return self.cache.cached(f"dfs-{name}")
+            if src.startswith("http"):
+                return self.cache.cached(f"remote-{name}")
+
+        return self.source_dir / src
+
+    def __dfs_datasets(self) -> datasets.DatasetIndex:
+        """Returns the DFS datasets of all amendments referenced by dfs: sources"""
+        with self.dfs_lock:
+            if self.dfs_datasets is None:
+                amdt_ids = {
+                    int(source_config["source"].split(":")[1])
+                    for source_config in self.config["data"].values()
+                    if source_config["type"] in REMOTE_TYPES
+                    and source_config["source"].startswith("dfs:")
+                }
+                self.dfs_datasets = datasets.get_dfs_datasets(self.cache, amdt_ids)
+
+        return self.dfs_datasets
+
+    def remote_sources(self) -> dict[str, dict]:
+        """Returns the data sources that are downloaded from remote (http or dfs:) locations"""
+        return {
+            name: source_config
+            for name, source_config in self.config["data"].items()
+            if source_config["type"] in REMOTE_TYPES
+            and source_config["source"].startswith(("http", "dfs:"))
+        }
+
+    def expired_sources(self) -> set[str]:
+        """Returns the http sources whose cached download is due for revalidation. DFS sources
+        are checked against the checksums of the dataset catalogue instead."""
+        return {
+            name
+            for name, source_config in self.remote_sources().items()
+            if source_config["source"].startswith("http")
+            and self.cache.is_expired(f"remote-{name}", REMOTE_TTL)
+        }
+
+    def prefetch(self, names: set[str] | None = None) -> bool:
+        """Downloads the given (default: all) remote data sources concurrently. Returns whether
+        all succeeded."""
+        sources = {
+            name: source_config
+            for name, source_config in self.remote_sources().items()
+            if names is None or name in names
+        }
+        if not sources:
+            return True
+
+        logging.info(f"Prefetching {len(sources)} remote sources...")
+        start = time.perf_counter()
+
+        # All DFS sources share one dataset catalogue, fetch it before the workers start
+        if any(source_config["source"].startswith("dfs:") for source_config in sources.values()):
+            self.__dfs_datasets()
+
+        def fetch(name: str, source_config: dict) -> float:
+            fetch_start = time.perf_counter()
+            self.__resolve(name, source_config)
+            return time.perf_counter() - fetch_start
+
+        failures = 0
+        with ThreadPoolExecutor(max_workers=max(1, self.fetch_workers)) as executor:
+            futures = {
+                executor.submit(fetch, name, source_config): name
+                for name, source_config in sources.items()
+            }
+
+            for done, future in enumerate(as_completed(futures), start=1):
+                name = futures[future]
+                try:
+                    elapsed = future.result()
+                except Exception as e:  # noqa: BLE001
+                    failures += 1
+                    logging.error(f"[{done}/{len(sources)}] Failed to fetch {name}: {e}")  # noqa: TRY400
+                    continue
+
+                logging.info(f"[{done}/{len(sources)}] {name} ready in {elapsed:.2f} s")
+
+        logging.info(
+            f"Prefetched {len(sources) - failures} of {len(sources)} remote sources in "
+            f"{time.perf_counter() - start:.2f} s.",
+        )
+        return failures == 0
+
+    def build(
+        self,
+        jobs: int = 1,
+        profiles: list[str] | None = None,
+        maps: list[str] | None = None,
+        force: bool = False,
+        prefetch: bool = True,
+    ) -> bool:
+        """Builds the given (default: all) profiles and maps, spreading the maps across jobs
+        worker processes if jobs > 1. Targets whose inputs did not change since the last build
+        are skipped unless force is set. Expired http sources are revalidated first. If
+        prefetch is set, the remote sources of the targets to build are downloaded concurrently
+        up front. Returns whether all maps were built
+        successfully."""
+        manifest = Manifest(self.target_dir / MANIFEST_FILE)
+        self.data_fingerprints = {}
+
+        # Sources are fingerprinted by their cached file, so expired ones are revalidated first
+        # (a conditional request if the server supports it) for their targets to be rebuilt
+        # if they changed
+        expired = self.expired_sources()
+        if expired:
+            self.prefetch(expired)
+
+        tasks = []
+        for profile_id, map_data in self.tasks(profiles, maps):
+            if not force and self.__is_current(manifest, profile_id, map_data):
+                logging.info(f"{map_data['map']} for profile {profile_id} is up to date.")
+                continue
+
+            tasks.append((profile_id, map_data))
+
+        if not tasks:
+            manifest.save()
+            return True
+
+        used = self.__recorded_data(manifest, tasks)
+        if prefetch:
+            # Without a record of a target, any source may be needed
+            self.prefetch(used)
+            # Refreshed sources must be recorded with their new contents
+            self.data_fingerprints = {}
+
+        # Parallel loading and forked workers need the data up front, otherwise it is loaded
+        # lazily by the templates using it. Only the sources the targets used last time are
+        # loaded, without a record of a target all of them are.
+        if jobs > 1 or self.loader.workers > 1:
+            self.data.preload(self.loader, used)
+
+        try:
+            if jobs > 1 and "fork" not in multiprocessing.get_all_start_methods():
+                logging.warning("Parallel builds require the fork start method, building serially.")
+                jobs = 1
+
+            if jobs > 1:
+                return self.build_parallel(tasks, jobs, manifest)
+
+            current_profile = None
+            for profile_id, map_data in tasks:
+                if profile_id != current_profile:
+                    logging.info(f"Building profile {profile_id}...")
+                    current_profile = profile_id
+
+                # Forget the target first, it must not count as up to date if the build fails
+                manifest.forget(map_data["target"])
+                used = self.build_profile_map(profile_id, map_data)
+                self.__record(manifest, profile_id, map_data, used)
+        finally:
+            manifest.save()
+            if self.geodesy_cache_file is not None:
+                geodesy.save_cache(self.geodesy_cache_file)
+
+            stats = self.jinja_handler.stats
+            logging.debug(
+                f"Jinja templates: {stats['compiled']} compiled, {stats['cached']} loaded from "
+                f"bytecode cache",
+            )
+            for name, stats in memo.stats().items():
+                if stats.total():
+                    logging.debug(
+                        f"Cache {name}: {stats['hits']} hits, {stats['misses']} misses "
+                        f"({stats['hits'] / stats.total():.0%} hit rate)",
+                    )
+
+        return True
+
+    def watch(
+        self,
+        jobs: int = 1,
+        profiles: list[str] | None = None,
+        maps: list[str] | None = None,
+        interval: float = 1.0,
+    ) -> None:
+        """Builds the given (default: all) profiles and maps, then polls the map tree and the
+        data source files every interval seconds and rebuilds the targets affected by changes,
+        until interrupted. Loaded data sources are kept and only reloaded when their own file
+        changes. Remote sources are never fetched while polling, only by the rebuilds. Changes
+        to mapbuilder.toml require a restart."""
+        tree = self.__map_tree_state()
+        self.__watch_build(jobs, profiles, maps, prefetch=True)
+        # Remote sources are only looked up in the cache, they are refreshed by the builds
+        sources = self.__source_states()
+        logging.info("Watching for changes, press Ctrl+C to stop.")
+
+        while True:
+            time.sleep(interval)
+
+            current_sources = self.__source_states()
+            current_tree = self.__map_tree_state()
+            if current_sources == sources and current_tree == tree:
+                continue
+
+            changed = [
+                name for name, state in current_sources.items() if state != sources.get(name)
+            ]
+            for name in changed:
+                if self.data.is_loaded(name):
+                    logging.info(f"Data source {name} changed, reloading on next use.")
+                self.data.invalidate(name)
+
+            if changed:
+                # Results computed from replaced data would keep it alive, geodesy is unaffected
+                memo.clear(by_identity=True)
+
+            sources, tree = current_sources, current_tree
+            self.__watch_build(jobs, profiles, maps, prefetch=False)
+
+    def __watch_build(self, jobs, profiles, maps, prefetch: bool) -> None:
+        start = time.perf_counter()
+        try:
+            success = self.build(jobs, profiles, maps, prefetch=prefetch)
+        except Exception as e:  # noqa: BLE001
+            logging.error(f"Build failed: {e}")  # noqa: TRY400
+            logging.debug("Traceback of the failed build", exc_info=e)
+            return
+
+        if success:
+            logging.info(f"Build finished in {time.perf_counter() - start:.2f} s.")
+
+    def __source_states(self) -> dict[str, tuple | None]:
+        """Returns the modification time and size of each data source file. Nothing is fetched,
+        remote sources are represented by their cached file."""
+        states = {}
+        for name, source_config in self.config["data"].items():
+            try:
+                source = self.__cached_source(name, source_config)
+                stat = source.stat() if source is not None else None
+            except Exception:  # noqa: BLE001
+                # Missing or unavailable, reported by the build using it
+                states[name] = None
+                continue
+
+            states[name] = (stat.st_mtime_ns, stat.st_size) if stat is not None else None
+
+        return states
+
+    def __map_tree_state(self) -> dict[str, tuple]:
+        """Returns the modification time and size of everything below the maps directory"""
+        maps_root = self.source_dir / "maps"
+        if not maps_root.is_dir():
+            return {}
+
+        states = {}
+        for item in maps_root.rglob("*"):
+            try:
+                stat = item.stat()
+            except FileNotFoundError:
+                continue
+
+            states[item.as_posix()] = (stat.st_mtime_ns, stat.st_size)
+
+        return states
+
+    def tasks(
+        self,
+        profiles: list[str] | None = None,
+        maps: list[str] | None = None,
+    ) -> list[tuple[str, dict]]:
+        """Returns the (profile, map) pairs to build for the given selection"""
+        return [
+            (profile_id, map_data)
+            for profile_id in self.config["profiles"]
+            if profiles is None or profile_id in profiles
+            for map_data in self.config["profiles"][profile_id]["maps"]
+            if maps is None or map_data["map"] in maps
+        ]
+
+    def build_parallel(
+        self,
+        tasks: list[tuple[str, dict]],
+        jobs: int,
+        manifest: Manifest | None = None,
+    ) -> bool:
+        """Builds the given (profile, map) pairs in forked worker processes. The workers inherit
+        the data loaded by this builder, so nothing is parsed twice."""
+        global _worker_builder
+        _worker_builder = self
+
+        logging.info(f"Building {len(tasks)} maps using {jobs} worker processes...")
+
+        failures = 0
+        try:
+            with ProcessPoolExecutor(
+                max_workers=jobs,
+                mp_context=multiprocessing.get_context("fork"),
+            ) as executor:
+                futures = [executor.submit(_build_map_worker, *task) for task in tasks]
+
+                for (profile_id, map_data), future in zip(tasks, futures, strict=True):
+                    if manifest is not None:
+                        manifest.forget(map_data["target"])
+
+                    used, error, stats, memo_stats, events = future.result()
+                    self.jinja_handler.stats.update(stats)
+                    memo.merge_stats(memo_stats)
+                    profiling.merge(events)
+                    if error is not None:
+                        failures += 1
+                        logging.error(
+                            f"Failed to build {map_data['map']} for profile {profile_id}: "
+                            f"{error}",
+                        )
+                    elif manifest is not None:
+                        self.__record(manifest, profile_id, map_data, used)
+        finally:
+            _worker_builder = None
+
+        if failures:
+            logging.error(f"{failures} of {len(tasks)} maps failed to build.")
+
+        return failures == 0
 
     def __best_item(self, profile_id, item):
         """Looks for the best file for an item."""
@@ -124,48 +440,132 @@ class Builder:
 
         return None
 
+    def __inputs_fingerprint(self, manifest: Manifest, profile_id: str, map_data: dict) -> str:
+        """Fingerprints everything a target depends on except for its data sources: the map tree
+        files, the resolved .d variants, the relevant configuration and the mapbuilder version."""
+        maps_root = self.source_dir / "maps" / map_data["map"]
+        files = []
+        if maps_root.is_dir():
+            self.__collect_inputs(manifest, profile_id, maps_root, maps_root, files)
+
+        return fingerprint(
+            MANIFEST_VERSION,
+            PACKAGE_VERSION,
+            profile_id,
+            self.config["profiles"][profile_id]["aliases"],
+            map_data,
+            self.config.get("runways"),
+            geodesy.get_model(),
+            files,
+        )
+
+    def __collect_inputs(self, manifest, profile_id, maps_root, rootdir, files):
+        """Collects the digests of the files build_visitor renders for a profile, only the
+        variant a .d directory resolves to is included"""
+        for item in sorted(rootdir.iterdir()):
+            relative = item.relative_to(maps_root).as_posix()
+            if item.is_dir() and item.suffix != ".d":
+                self.__collect_inputs(manifest, profile_id, maps_root, item, files)
+            elif item.is_dir():
+                best_item = self.__best_item(profile_id, item)
+                files.append(
+                    (relative, best_item.name, manifest.digest(best_item))
+                    if best_item
+                    else (relative, None, None),
+                )
+            else:
+                files.append((relative, manifest.digest(item)))
+
+    def __data_fingerprint(self, manifest: Manifest, name: str) -> str | None:
+        """Fingerprints the configuration and source file of a data source. Remote sources are
+        fingerprinted by their cached file, one not downloaded yet is not remembered so it is
+        fingerprinted again once the build fetched it."""
+        if name in self.data_fingerprints:
+            return self.data_fingerprints[name]
+
+        source_config = self.config["data"].get(name)
+        source = self.__cached_source(name, source_config) if source_config else None
+        digest = manifest.digest(source) if source is not None and source.is_file() else None
+        data_fingerprint = fingerprint(source_config, digest)
+        if digest is not None:
+            self.data_fingerprints[name] = data_fingerprint
+
+        return data_fingerprint
+
+    def __is_current(self, manifest: Manifest, profile_id: str, map_data: dict) -> bool:
+        entry = manifest.entry(map_data["target"])
+        if entry is None or not (self.target_dir / map_data["target"]).is_file():
+            return False
+
+        if entry["inputs"] != self.__inputs_fingerprint(manifest, profile_id, map_data):
+            return False
+
+        return all(
+            self.__data_fingerprint(manifest, name) == data_fingerprint
+            for name, data_fingerprint in entry["data"].items()
+        )
+
+    def __recorded_data(self, manifest: Manifest, tasks: list[tuple[str, dict]]) -> set | None:
+        """Returns the data sources the targets of tasks used when they were last built, or None
+        if a target has no record"""
+        names = set()
+        for _, map_data in tasks:
+            entry = manifest.entry(map_data["target"])
+            if entry is None:
+                return None
+
+            names.update(entry["data"])
+
+        return names
+
+    def __record(self, manifest: Manifest, profile_id: str, map_data: dict, used: set | None):
+        if used is None:
+            return
+
+        manifest.record(
+            map_data["target"],
+            self.__inputs_fingerprint(manifest, profile_id, map_data),
+            {name: self.__data_fingerprint(manifest, name) for name in sorted(used)},
+        )
+
     def __handle_item(self, item):
+        """Returns an iterator over the output chunks for the given item"""
         if item.suffix == ".txt":
-            return PlainTextHandler().handle(item)
+            return PlainTextHandler().stream(item)
         elif item.suffix == ".jinja":
-            return self.jinja_handler.handle(item)
+            return self.jinja_handler.stream(item)
         else:
             logging.warning(f"No handler for file type {item.suffix} known. Skipping.")
             return None
 
-    def build_profile(self, profile_id: str):
-        logging.info(f"Building profile {profile_id}...")
-
-        for map_data in self.config["profiles"][profile_id]["maps"]:
-            self.build_profile_map(profile_id, map_data)
-
-    def build_profile_map(self, profile_id: str, map_data: dict):
+    def build_profile_map(self, profile_id: str, map_data: dict) -> set[str] | None:
+        """Builds a single map, returns the names of the data sources it used or None if the map
+        could not be built."""
         map_id = map_data["map"]
         target_file = map_data["target"]
         maps_root = self.source_dir / "maps" / map_id
 
         if not maps_root.is_dir():
             logging.error("No map directory. Bailing out.")
-            return
+            return None
 
         header = f"// {map_id} {profile_id}\n// Auto-generated by mapbuilder. Do not edit manually."
 
         if map_data.get("timestamp"):
             header = header + f"\n// Generation time: {datetime.now(tz=UTC)}"
 
-        profile_contents = [header]
-
-        self.build_visitor(profile_id, maps_root, profile_contents)
-
-        profile_content = "\n\n".join(profile_contents)
-
-        with (self.target_dir / Path(target_file)).open(
-                mode="w",
-                encoding="iso-8859-1",
-        ) as tgt_file:
-            tgt_file.write(profile_content)
+        # Fragments are written as they are rendered and only replace the target once complete
+        with (
+            profiling.span(f"write {target_file}", "target", profile=profile_id, map=map_id),
+            atomic_open(self.target_dir / Path(target_file), encoding="iso-8859-1") as tgt_file,
+            self.data.track() as used,
+        ):
+            profile_contents = FragmentWriter(tgt_file)
+            profile_contents.append(header)
+            self.build_visitor(profile_id, maps_root, profile_contents)
 
-        logging.info(f"Built {map_id}.")
+        logging.info(f"Built {map_id} for profile {profile_id}.")
+        return used
 
     def build_visitor(self, profile_id, rootdir, profile_contents):
         # Possibly inefficient, but we do not have a large number of files (hopefully)
@@ -183,6 +583,44 @@ class Builder:
                     if best_item:
                         item = best_item
 
-                content = self.__handle_item(item)
-                if content:
-                    profile_contents.append(content)
+                with profiling.span(
+                    functools.partial(_relative_name, item, self.source_dir),
+                    "item",
+                    profile=profile_id,
+                ):
+                    profile_contents.append(self.__handle_item(item))
+
+
+def _relative_name(item: Path, directory: Path) -> str:
+    return str(item.relative_to(directory))
+
+
+def _build_map_worker(
+    profile_id: str,
+    map_data: dict,
+) -> tuple[set[str] | None, str | None, Counter, dict[str, Counter], list[dict]]:
+    """Builds a single map in a worker process. Returns the data sources used by the map, an
+    error description on failure, the template and cache statistics and the profiling events
+    of this map."""
+    assert _worker_builder is not None
+    stats_before = _worker_builder.jinja_handler.stats.copy()
+    memo_stats_before = memo.stats()
+
+    try:
+        used = _worker_builder.build_profile_map(profile_id, map_data)
+        error = None
+    except Exception as e:  # noqa: BLE001
+        logging.debug(
+            f"Building {map_data['map']} for profile {profile_id} failed:\n"
+            f"{traceback.format_exc()}"
+        )
+        used = None
+        error = f"{type(e).__name__}: {e}"
+
+    return (
+        used,
+        error,
+        _worker_builder.jinja_handler.stats - stats_before,
+        memo.stats_since(memo_stats_before),
+        profiling.collect(),
+    )
@@ -1,43 +1,181 @@
+import hashlib
+import http.client
+import json
 import logging
 import re
 import shutil
 import tempfile
+import threading
 import time
 import zipfile
+from email.message import Message
 from io import BytesIO
 from pathlib import Path
 from urllib import request
+from urllib.error import HTTPError
+from urllib.parse import urljoin, urlsplit
+
+# A checksum as (type, value), e.g. ("SHA-256", "ab12...")
+Checksum = tuple[str, str]
+
+
+class HTTPClient:
+    """A minimal HTTP client keeping one connection per thread and host alive, so consecutive
+    downloads from the same host reuse it. Falls back to urllib if proxies are configured."""
+
+    MAX_REDIRECTS = 5
+    REDIRECT_STATUS = (301, 302, 303, 307, 308)
+
+    def __init__(self, timeout: float = 120) -> None:
+        self.timeout = timeout
+        self.local = threading.local()
+        self.use_urllib = bool(request.getproxies())
+
+    def get(self, url: str, headers: dict[str, str]) -> tuple[int, Message, bytes]:
+        """Performs a GET request, returns the status, headers and body of the response.
+        Raises HTTPError for error responses, 304 Not Modified is returned as a status."""
+        headers = {"User-Agent": "mapbuilder", **headers}
+
+        for _ in range(self.MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            if self.use_urllib or parts.scheme not in {"http", "https"}:
+                return self.__urllib_get(url, headers)
+
+            response, body = self.__request(parts, headers)
+
+            location = response.getheader("Location")
+            if response.status in self.REDIRECT_STATUS and location:
+                url = urljoin(url, location)
+                continue
+
+            if response.status >= 400:
+                raise HTTPError(url, response.status, response.reason, response.headers, None)
+
+            return response.status, response.headers, body
+
+        raise HTTPError(url, response.status, "Too many redirects", response.headers, None)
+
+    def __request(self, parts, headers: dict[str, str]):
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        try:
+            return self.__send(parts.scheme, parts.netloc, path, headers)
+        except (http.client.HTTPException, ConnectionError):
+            # The server may have closed an idle keep-alive connection, retry once
+            self.__close(parts.scheme, parts.netloc)
+            return self.__send(parts.scheme, parts.netloc, path, headers)
+
+    def __send(self, scheme: str, netloc: str, path: str, headers: dict[str, str]):
+        connection = self.__connection(scheme, netloc)
+        connection.request("GET", path, headers=headers)
+        response = connection.getresponse()
+        return response, response.read()
+
+    def __connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        connections = self.local.__dict__.setdefault("connections", {})
+        if (scheme, netloc) not in connections:
+            connection_class = (
+                http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            )
+            connections[scheme, netloc] = connection_class(netloc, timeout=self.timeout)
+
+        return connections[scheme, netloc]
+
+    def __close(self, scheme: str, netloc: str) -> None:
+        connections = self.local.__dict__.get("connections", {})
+        connection = connections.pop((scheme, netloc), None)
+        if connection is not None:
+            connection.close()
+
+    @staticmethod
+    def __urllib_get(url: str, headers: dict[str, str]) -> tuple[int, Message, bytes]:
+        try:
+            with request.urlopen(request.Request(url, headers=headers)) as response:
+                return response.status, response.headers, response.read()
+        except HTTPError as e:
+            if e.code == 304:
+                return e.code, e.headers, b""
+            raise
 
 
 class Cache:
     """A rather primitive caching mechanism for resources from the interwebs.
-    Unzips zipfiles (hello DFS)."""
+    Unzips zipfiles (hello DFS).
+
+    Next to every entry, a sidecar file records the ETag and Last-Modified headers of the
+    download, so expired entries are revalidated with a conditional request instead of being
+    downloaded again. Entries fetched with a checksum are keyed on that checksum and are only
+    downloaded again once the checksum changes."""
 
     def __init__(self, cache_location: Path) -> None:
         self.cache_location = cache_location
+        self.http = HTTPClient()
 
         if not cache_location.exists():
-            cache_location.mkdir()
+            cache_location.mkdir(parents=True)
 
-    def get(self, item: str, url: str, ttl: int = 24) -> Path:
+    def get(self, item: str, url: str, ttl: int = 24, checksum: Checksum | None = None) -> Path:
         cache_path = self.__path(item)
-        if cache_path.exists():
-            mtime = cache_path.stat().st_mtime
-            if mtime < time.time() - ttl * 3600:
-                self.fetch(url, cache_path)
-        else:
-            self.fetch(url, cache_path)
+        metadata = self.__read_metadata(cache_path)
+
+        if not cache_path.exists():
+            self.fetch(url, cache_path, checksum)
+        elif checksum is not None:
+            if metadata.get("url") != url or metadata.get("checksum") != list(checksum):
+                self.fetch(url, cache_path, checksum)
+            else:
+                logging.debug(f"Cached {item} matches checksum {checksum[1]}")
+        elif cache_path.stat().st_mtime < time.time() - ttl * 3600:
+            validators = metadata if metadata.get("url") == url else None
+            if not self.fetch(url, cache_path, validators=validators):
+                logging.debug(f"{url} not modified, refreshing cached {item}")
+                cache_path.touch()
 
         return cache_path
 
-    def fetch(self, url: str, target_file: Path):
+    def cached(self, item: str) -> Path | None:
+        """Returns the path of an item if it is in the cache, without fetching or revalidating
+        it"""
+        cache_path = self.__path(item)
+        return cache_path if cache_path.exists() else None
+
+    def is_expired(self, item: str, ttl: int) -> bool:
+        """Returns whether an item is in the cache but older than ttl hours"""
+        cache_path = self.__path(item)
+        return cache_path.exists() and cache_path.stat().st_mtime < time.time() - ttl * 3600
+
+    def fetch(
+        self,
+        url: str,
+        target_file: Path,
+        checksum: Checksum | None = None,
+        validators: dict | None = None,
+    ) -> bool:
+        """Downloads url to target_file and verifies the checksum, if given. With validators
+        (the recorded metadata of a previous download), the request is conditional. Returns False
+        if the remote resource was not modified, target_file is left untouched then."""
         logging.debug(f"Fetching {url}...")
+        headers = {}
+        if validators is not None:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+        status, response_headers, payload = self.http.get(url, headers)
+        if status == 304:
+            return False
+
+        content = BytesIO(payload)
+
+        if checksum is not None:
+            verify_checksum(content.getbuffer(), checksum, url)
+
         if target_file.exists():
             target_file.unlink()
 
-        with request.urlopen(url) as response:
-            content = BytesIO(response.read())
-
         if zipfile.is_zipfile(content):
             logging.debug("Unzipping...")
             with zipfile.ZipFile(content, "r") as zip_file:
@@ -53,6 +191,51 @@ class Cache:
             with target_file.open("wb") as f:
                 f.write(content.getbuffer())
 
+        self.__write_metadata(
+            target_file,
+            {
+                "url": url,
+                "etag": response_headers.get("ETag"),
+                "last_modified": response_headers.get("Last-Modified"),
+                "checksum": list(checksum) if checksum is not None else None,
+            },
+        )
+        return True
+
     def __path(self, item: str) -> Path:
         """Returns the path name for a given item in the cache."""
         return self.cache_location / re.sub(r'[\\/:\*\?"<>\|]', "", item)
+
+    @staticmethod
+    def __metadata_path(cache_path: Path) -> Path:
+        return cache_path.with_name(f"{cache_path.name}.meta.json")
+
+    def __read_metadata(self, cache_path: Path) -> dict:
+        metadata_path = self.__metadata_path(cache_path)
+        if not metadata_path.is_file():
+            return {}
+
+        try:
+            with metadata_path.open("r", encoding="utf-8") as f:
+                return json.load(f)
+        except ValueError:
+            logging.warning(f"Ignoring unreadable cache metadata {metadata_path}")
+            return {}
+
+    def __write_metadata(self, cache_path: Path, metadata: dict) -> None:
+        with self.__metadata_path(cache_path).open("w", encoding="utf-8") as f:
+            json.dump(metadata, f)
+
+
+def verify_checksum(content: memoryview | bytes, checksum: Checksum, url: str) -> None:
+    """Raises a ValueError if content does not match the checksum. Unknown checksum types are
+    logged and not verified."""
+    algorithm = re.sub(r"[-_\s]", "", checksum[0]).lower()
+    if algorithm not in hashlib.algorithms_available:
+        logging.warning(f"Cannot verify {checksum[0]} checksum of {url}")
+        return
+
+    digest = hashlib.new(algorithm, content).hexdigest()
+    if digest.lower() != checksum[1].lower():
+        msg = f"Checksum mismatch for {url}: expected {checksum[1]}, got {digest}"
+        raise ValueError(msg)
@@ -1,7 +1,11 @@
+import logging
 from dataclasses import dataclass, field
 
+import numpy as np
 from lxml import etree
-from shapely import Geometry, LinearRing, LineString
+from shapely import Geometry
+
+from mapbuilder.data.parsing import LINE, RING, GeometryBatch, release
 
 AIXM_NAMESPACES = {
     "gss": "http://www.isotc211.org/2005/gss",
@@ -32,6 +36,9 @@ AIXM_POLY_FEATURES = [
 
 AIXM_LINE_FEATURES = ["GuidanceLine", "GuidanceLineMarking", "TaxiwayMarking"]
 
+# Bump whenever the parsed representation changes, invalidates parsed data caches
+AIXM_PARSER_VERSION = 1
+
 
 @dataclass
 class AIXMFeature:
@@ -80,27 +87,89 @@ AIXM_LINE_TAGS = [_ns("aixm", ft) for ft in AIXM_LINE_FEATURES]
 AIXM_TAGS = [*AIXM_POLY_TAGS, *AIXM_LINE_TAGS]
 APRON_TAG = _ns("aixm", "Apron")
 TAXIWAY_TAG = _ns("aixm", "Taxiway")
+FEATURE_TAGS = [APRON_TAG, TAXIWAY_TAG, *AIXM_TAGS]
+
+NAME_TAG = _ns("aixm", "name")
+TYPE_TAG = _ns("aixm", "type")
+DESIGNATOR_TAG = _ns("aixm", "designator")
+COLOUR_TAG = _ns("aixm", "colour")
+STYLE_TAG = _ns("aixm", "style")
+MARKING_LOCATION_TAG = _ns("aixm", "markingLocation")
+COMPOSITION_TAG = _ns("aixm", "composition")
+ABANDONED_TAG = _ns("aixm", "abandoned")
+WIDTH_TAG = _ns("aixm", "width")
+POS_LIST_TAG = _ns("gml", "posList")
+XLINK_HREF = _ns("xlink", "href")
+
+# Links to other features: feature type -> (link element, AIXMFeature attribute)
+FEATURE_LINKS = {
+    "ApronElement": (_ns("aixm", "associatedApron"), "apron"),
+    "TaxiwayMarking": (_ns("aixm", "markedTaxiway"), "marked_taxiway"),
+    "TaxiwayElement": (_ns("aixm", "associatedTaxiway"), "taxiway"),
+    "GuidanceLineMarking": (_ns("aixm", "markedGuidanceLine"), "marked_guidance_line"),
+}
+LINK_TAGS = [link_tag for link_tag, _ in FEATURE_LINKS.values()]
+SCAN_TAGS = [
+    NAME_TAG,
+    TYPE_TAG,
+    DESIGNATOR_TAG,
+    COLOUR_TAG,
+    STYLE_TAG,
+    MARKING_LOCATION_TAG,
+    COMPOSITION_TAG,
+    ABANDONED_TAG,
+    WIDTH_TAG,
+    POS_LIST_TAG,
+    *LINK_TAGS,
+]
+
+IDENTIFIER_XPATH = etree.XPath("gml:identifier", namespaces=AIXM_NAMESPACES)
+
+
+def parse_pos_list(raw_geometry: str | None) -> np.ndarray:
+    """Parses geometries into an array of lat/lon pairs"""
+    if not raw_geometry or raw_geometry.isspace():
+        # fromstring() reads a blank string as [-1.0]
+        return np.empty((0, 2))
 
+    return np.fromstring(raw_geometry, sep=" ").reshape(-1, 2)
 
-def parse_pos_list(raw_geometry):
-    """Parses geometries into lat/lon pairs"""
-    geometry_parts = iter(raw_geometry.split(" "))
 
-    geometry = []
+class GeometryCollector:
+    """Collects the posLists of all features while parsing, builds their geometries in batches
+    and hands them to the features once parsing is done."""
 
-    for geo in geometry_parts:
-        x = float(geo)
-        y = float(next(geometry_parts))
-        geometry.append((x, y))
+    def __init__(self) -> None:
+        self.features: list[AIXMFeature] = []
+        self.counts: list[int] = []
+        self.batch = GeometryBatch()
 
-    return geometry
+    def add(self, feature: AIXMFeature, pos_lists: list[np.ndarray], is_poly: bool) -> None:
+        self.features.append(feature)
+        self.counts.append(len(pos_lists))
+        for pos_list in pos_lists:
+            self.batch.add(RING if is_poly and len(pos_list) > 2 else LINE, pos_list)
+
+    def build(self) -> None:
+        geometries = self.batch.build()
+
+        offset = 0
+        for feature, count in zip(self.features, self.counts, strict=True):
+            feature.geometries.extend(geometries[offset : offset + count])
+            offset += count
 
 
 def resolve_links(dataset):
-    """Resolves apron and taxiway links"""
+    """Resolves apron and taxiway links. Elements without a known link target are left out of
+    the lookup tables."""
 
     for _, apron_element in dataset["ApronElement"].items():
-        apron_name = dataset["_Apron"][apron_element.apron].name
+        apron = dataset["_Apron"].get(apron_element.apron)
+        if apron is None:
+            logging.warning(f"ApronElement {apron_element.id} is not linked to a known apron")
+            continue
+
+        apron_name = apron.name
 
         if apron_name not in dataset["ApronElementByApron"]:
             dataset["ApronElementByApron"][apron_name] = [apron_element]
@@ -125,7 +194,12 @@ def resolve_links(dataset):
 
     if "TaxiwayMarking" in dataset:
         for _, marking in dataset["TaxiwayMarking"].items():
-            twy_desig = dataset["_Taxiway"][marking.marked_taxiway].designator
+            taxiway = dataset["_Taxiway"].get(marking.marked_taxiway)
+            if taxiway is None:
+                logging.warning(f"TaxiwayMarking {marking.id} is not linked to a known taxiway")
+                continue
+
+            twy_desig = taxiway.designator
 
             if twy_desig not in dataset["TaxiwayMarkingByDesig"]:
                 dataset["TaxiwayMarkingByDesig"][twy_desig] = [marking]
@@ -133,8 +207,9 @@ def resolve_links(dataset):
                 dataset["TaxiwayMarkingByDesig"][twy_desig].append(marking)
 
 
-def parse_aixm(xml_file):
-    result = {
+def new_dataset() -> dict:
+    """Returns an empty dataset with the lookup tables filled by the parser and resolve_links"""
+    return {
         "_Apron": {},
         "ApronElementByApron": {},
         "GuidanceLineByDesig": {},
@@ -142,92 +217,87 @@ def parse_aixm(xml_file):
         "TaxiwayMarkingByDesig": {},
         "_Taxiway": {},
     }
-    context = etree.iterparse(xml_file)
+
+
+def _scan(elem) -> tuple[dict[str, str], dict[str, str], list[str]]:
+    """Collects the first text of every wanted descendant, the first target of every link and
+    all posLists of a feature in a single pass over its descendants."""
+    texts = {}
+    links = {}
+    pos_lists = []
+
+    for child in elem.iterdescendants(SCAN_TAGS):
+        tag = child.tag
+        if tag == POS_LIST_TAG:
+            pos_lists.append(child.text)
+        elif tag in LINK_TAGS:
+            href = child.get(XLINK_HREF)
+            # Links without a target (e.g. nilReason only) are skipped
+            if href is not None and tag not in links:
+                links[tag] = href.replace("urn:uuid:", "")
+        elif tag not in texts:
+            texts[tag] = child.text or ""
+
+    return texts, links, pos_lists
+
+
+def parse_aixm(xml_file):
+    result = new_dataset()
+    collector = GeometryCollector()
+    context = etree.iterparse(xml_file, events=("end",), tag=FEATURE_TAGS)
 
     for _action, elem in context:
+        identifiers = IDENTIFIER_XPATH(elem)
+        feature_id = (identifiers[0].text or "") if identifiers else None
+        texts, links, pos_lists = _scan(elem)
+
         if elem.tag == APRON_TAG:
-            apn_id = elem.findtext("gml:identifier", namespaces=AIXM_NAMESPACES)
-            result["_Apron"][apn_id] = AIXMApron(
-                id=apn_id,
-                name=elem.findtext(".//aixm:name", namespaces=AIXM_NAMESPACES),
-                surface=elem.findtext(".//aixm:composition", namespaces=AIXM_NAMESPACES),
-                abandoned=elem.findtext(".//aixm:abandoned", namespaces=AIXM_NAMESPACES) == "YES",
+            result["_Apron"][feature_id] = AIXMApron(
+                id=feature_id,
+                name=texts.get(NAME_TAG),
+                surface=texts.get(COMPOSITION_TAG),
+                abandoned=texts.get(ABANDONED_TAG) == "YES",
             )
-
-            elem.clear()
         elif elem.tag == TAXIWAY_TAG:
-            twy_id = elem.findtext("gml:identifier", namespaces=AIXM_NAMESPACES)
-            result["_Taxiway"][twy_id] = AIXMTaxiway(
-                id=twy_id,
-                designator=elem.findtext(".//aixm:designator", namespaces=AIXM_NAMESPACES),
-                type=elem.findtext(".//aixm:type", namespaces=AIXM_NAMESPACES),
-                width=elem.findtext(".//aixm:width", namespaces=AIXM_NAMESPACES),
-                surface=elem.findtext(".//aixm:composition", namespaces=AIXM_NAMESPACES),
-                abandoned=elem.findtext(".//aixm:abandoned", namespaces=AIXM_NAMESPACES) == "YES",
+            result["_Taxiway"][feature_id] = AIXMTaxiway(
+                id=feature_id,
+                designator=texts.get(DESIGNATOR_TAG),
+                type=texts.get(TYPE_TAG),
+                width=texts.get(WIDTH_TAG),
+                surface=texts.get(COMPOSITION_TAG),
+                abandoned=texts.get(ABANDONED_TAG) == "YES",
             )
-
-            elem.clear()
-        elif elem.tag in AIXM_TAGS:
+        else:
             feature_type = elem.tag.split("}")[1]
-            feature_id = elem.findtext("gml:identifier", namespaces=AIXM_NAMESPACES)
             is_poly = elem.tag in AIXM_POLY_TAGS
 
             feature = AIXMFeature(
                 id=feature_id,
                 feature=feature_type,
-                type=elem.findtext(".//aixm:type", namespaces=AIXM_NAMESPACES),
-                name=elem.findtext(".//aixm:name", namespaces=AIXM_NAMESPACES),
-                designator=elem.findtext(".//aixm:designator", namespaces=AIXM_NAMESPACES),
-                color=elem.findtext(".//aixm:colour", namespaces=AIXM_NAMESPACES),
-                style=elem.findtext(".//aixm:style", namespaces=AIXM_NAMESPACES),
-                marking_location=elem.findtext(
-                    ".//aixm:markingLocation",
-                    namespaces=AIXM_NAMESPACES,
-                ),
+                type=texts.get(TYPE_TAG),
+                name=texts.get(NAME_TAG),
+                designator=texts.get(DESIGNATOR_TAG),
+                color=texts.get(COLOUR_TAG),
+                style=texts.get(STYLE_TAG),
+                marking_location=texts.get(MARKING_LOCATION_TAG),
                 geometries=[],
                 geometry_type="poly" if is_poly else "line",
             )
 
-            if feature_type == "ApronElement":
-                apron_link = elem.find(".//aixm:associatedApron", namespaces=AIXM_NAMESPACES)
-                if apron_link is not None:
-                    feature.apron = apron_link.attrib[_ns("xlink", "href")].replace("urn:uuid:", "")
-
-            if feature_type == "TaxiwayMarking":
-                twy_link = elem.find(".//aixm:markedTaxiway", namespaces=AIXM_NAMESPACES)
-                if twy_link is not None:
-                    feature.marked_taxiway = twy_link.attrib[_ns("xlink", "href")].replace(
-                        "urn:uuid:",
-                        "",
-                    )
-
-            if feature_type == "TaxiwayElement":
-                twy_link = elem.find(".//aixm:associatedTaxiway", namespaces=AIXM_NAMESPACES)
-                if twy_link is not None:
-                    feature.taxiway = twy_link.attrib[_ns("xlink", "href")].replace("urn:uuid:", "")
-
-            if feature_type == "GuidanceLineMarking":
-                twy_link = elem.find(".//aixm:markedGuidanceLine", namespaces=AIXM_NAMESPACES)
-                if twy_link is not None:
-                    feature.marked_guidance_line = twy_link.attrib[_ns("xlink", "href")].replace(
-                        "urn:uuid:",
-                        "",
-                    )
-
-            for poslist_element in elem.findall(".//gml:posList", namespaces=AIXM_NAMESPACES):
-                poslist = parse_pos_list(poslist_element.text)
-
-                if is_poly and len(poslist) > 2:
-                    feature.geometries.append(LinearRing(poslist))
-                else:
-                    feature.geometries.append(LineString(poslist))
+            if feature_type in FEATURE_LINKS:
+                link_tag, attribute = FEATURE_LINKS[feature_type]
+                if link_tag in links:
+                    setattr(feature, attribute, links[link_tag])
+
+            collector.add(feature, [parse_pos_list(pos_list) for pos_list in pos_lists], is_poly)
 
             if feature_type not in result:
                 result[feature_type] = {feature_id: feature}
             else:
                 result[feature_type][feature_id] = feature
 
-            elem.clear()
+        release(elem)
 
+    collector.build()
     resolve_links(result)
     return result
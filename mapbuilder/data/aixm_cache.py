@@ -0,0 +1,135 @@
+import hashlib
+import logging
+import os
+import pickle
+from dataclasses import fields
+from pathlib import Path
+
+import numpy as np
+import shapely
+from shapely import LinearRing
+
+from mapbuilder.data.aixm2 import (
+    AIXM_PARSER_VERSION,
+    AIXMApron,
+    AIXMFeature,
+    AIXMTaxiway,
+    new_dataset,
+    parse_aixm,
+    resolve_links,
+)
+from mapbuilder.data.parsing import build_geometries
+
+FEATURE_COLUMNS = [f.name for f in fields(AIXMFeature) if f.name != "geometries"]
+APRON_COLUMNS = [f.name for f in fields(AIXMApron)]
+TAXIWAY_COLUMNS = [f.name for f in fields(AIXMTaxiway)]
+
+
+def file_digest(file: Path) -> str:
+    """Returns the SHA-256 digest of the given file's contents"""
+    with file.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def parse_aixm_cached(xml_file: Path, cache_file: Path) -> dict:
+    """Parses an AIXM file, reusing the parsed data stored in cache_file if it was created from
+    the same file contents by the same parser version."""
+    digest = file_digest(xml_file)
+
+    if cache_file.exists():
+        try:
+            dataset = load_dataset(cache_file, digest)
+        except (
+            OSError,
+            EOFError,
+            ValueError,
+            KeyError,
+            AttributeError,
+            ImportError,
+            pickle.UnpicklingError,
+        ):
+            logging.warning(f"Cannot read parsed AIXM cache {cache_file}, re-parsing.")
+            dataset = None
+
+        if dataset is not None:
+            logging.debug(f"Using parsed AIXM data from {cache_file}")
+            return dataset
+
+    dataset = parse_aixm(xml_file)
+    store_dataset(cache_file, digest, dataset)
+    return dataset
+
+
+def store_dataset(cache_file: Path, digest: str, dataset: dict) -> None:
+    """Stores a parsed AIXM dataset in a columnar form, geometries as flat coordinate arrays"""
+    index_keys = new_dataset().keys()
+    features = [
+        feature
+        for feature_type, items in dataset.items()
+        if feature_type not in index_keys
+        for feature in items.values()
+    ]
+    geometries = [geometry for feature in features for geometry in feature.geometries]
+    coords, geometry_index = shapely.get_coordinates(geometries, return_index=True)
+
+    payload = {
+        "version": AIXM_PARSER_VERSION,
+        "digest": digest,
+        "features": _columns(features, FEATURE_COLUMNS),
+        "geometry_counts": np.array([len(f.geometries) for f in features], dtype=np.int64),
+        "geometry_rings": np.array([isinstance(g, LinearRing) for g in geometries], dtype=bool),
+        "geometry_index": geometry_index,
+        "coords": coords,
+        "aprons": _columns(dataset["_Apron"].values(), APRON_COLUMNS),
+        "taxiways": _columns(dataset["_Taxiway"].values(), TAXIWAY_COLUMNS),
+    }
+
+    # Write to a temporary file first, parallel loaders may read the cache at the same time
+    tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+    with tmp_file.open("wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp_file.replace(cache_file)
+
+
+def load_dataset(cache_file: Path, digest: str) -> dict | None:
+    """Loads a dataset stored by store_dataset, returns None if the cache is outdated"""
+    with cache_file.open("rb") as f:
+        payload = pickle.load(f)
+
+    if payload.get("version") != AIXM_PARSER_VERSION or payload.get("digest") != digest:
+        return None
+
+    geometries = build_geometries(
+        payload["coords"],
+        payload["geometry_index"],
+        payload["geometry_rings"],
+    )
+    offsets = np.concatenate(([0], np.cumsum(payload["geometry_counts"])))
+
+    dataset = new_dataset()
+    for apron in _rows(payload["aprons"], APRON_COLUMNS, AIXMApron):
+        dataset["_Apron"][apron.id] = apron
+    for taxiway in _rows(payload["taxiways"], TAXIWAY_COLUMNS, AIXMTaxiway):
+        dataset["_Taxiway"][taxiway.id] = taxiway
+
+    columns = payload["features"]
+    for idx in range(len(payload["geometry_counts"])):
+        feature = AIXMFeature(
+            geometries=list(geometries[offsets[idx] : offsets[idx + 1]]),
+            **{column: columns[column][idx] for column in FEATURE_COLUMNS},
+        )
+        dataset.setdefault(feature.feature, {})[feature.id] = feature
+
+    resolve_links(dataset)
+    return dataset
+
+
+def _columns(records, columns: list[str]) -> dict[str, list]:
+    records = list(records)
+    return {column: [getattr(record, column) for record in records] for column in columns}
+
+
+def _rows(data: dict[str, list], columns: list[str], cls):
+    count = len(data[columns[0]])
+    for idx in range(count):
+        yield cls(**{column: data[column][idx] for column in columns})
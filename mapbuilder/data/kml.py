@@ -1,10 +1,158 @@
 from pathlib import Path
 
+import numpy as np
 import xmltodict
+from lxml import etree
 from shapely import LinearRing, LineString, Point
 
+from mapbuilder.data.parsing import LINE, POINT, RING, GeometryBatch, release
+
+CONTAINER_TAGS = ("Document", "Folder")
+SCAN_TAGS = ("{*}Document", "{*}Folder", "{*}Placemark", "{*}name")
+# Placemark geometries in the order KMLParser checks them, with the path to their coordinates
+GEOMETRY_PATHS = {
+    "LineString": ["coordinates"],
+    "Polygon": ["outerBoundaryIs", "LinearRing", "coordinates"],
+    "Point": ["coordinates"],
+}
+GEOMETRY_KINDS = {"LineString": LINE, "Polygon": RING, "Point": POINT}
+
+
+def parse_kml(file: Path, root: str | None = None) -> dict:
+    """Reads a KML file into nested dicts of folder names, ending in lists of geometries by
+    placemark name, starting at the folder named root if given.
+
+    Produces the same structure as KMLParser, but streams the document instead of loading it as
+    a whole, frees every placemark once it is read and builds the geometries in bulk."""
+    stack = [_Container()]
+    collector = GeometryBatch()
+
+    for event, elem in etree.iterparse(file, events=("start", "end"), tag=SCAN_TAGS):
+        tag = _local_name(elem.tag)
+
+        if tag == "name":
+            # Only containers need their name recorded here, placemarks are read as a whole
+            parent = elem.getparent()
+            if (
+                event == "end"
+                and stack[-1].name is None
+                and parent is not None
+                and _local_name(parent.tag) in CONTAINER_TAGS
+            ):
+                stack[-1].name = (elem.text or "").strip()
+        elif event == "start":
+            if tag in CONTAINER_TAGS:
+                stack.append(_Container())
+        elif tag == "Placemark":
+            stack[-1].placemarks.append(read_placemark(elem, collector))
+            release(elem)
+        else:
+            container = stack.pop()
+            if tag == "Document":
+                stack[-1].documents.append(container)
+            else:
+                stack[-1].folders.append(container)
+            release(elem)
+
+    result = stack[0].fill({}, collector.build())
+    if root is not None and root in result:
+        return result[root]
+
+    return result
+
+
+def read_placemark(elem, collector: GeometryBatch) -> tuple[str, int]:
+    """Returns the name of a placemark and the index of its geometry in collector"""
+    name = ""
+    geometries = {}
+    for child in elem:
+        if not isinstance(child.tag, str):
+            continue
+
+        tag = _local_name(child.tag)
+        if tag == "name":
+            name = (child.text or "").strip()
+        elif tag in GEOMETRY_PATHS and tag not in geometries:
+            geometries[tag] = child
+
+    for geometry_type, path in GEOMETRY_PATHS.items():
+        if geometry_type in geometries:
+            coordinates = _find(geometries[geometry_type], path)
+            if coordinates is not None:
+                return name, collector.add(
+                    GEOMETRY_KINDS[geometry_type],
+                    parse_coordinates(coordinates),
+                )
+
+    msg = f"Placemark {name} unknown"
+    raise ValueError(msg)
+
+
+def parse_coordinates(raw: str) -> np.ndarray:
+    """Parses KML coordinate tuples (lon,lat[,alt]) into an array of lat/lon pairs"""
+    tuples = raw.split()
+    dims = tuples[0].count(",") + 1 if tuples else 2
+    coords = np.fromstring(raw.replace(",", " "), sep=" ")
+
+    if coords.size != len(tuples) * dims:
+        # Tuples with and without altitude mixed
+        coords = np.array([t.split(",")[:2] for t in tuples], dtype=float)
+        dims = 2
+
+    return coords.reshape(-1, dims)[:, [1, 0]]
+
+
+class _Container:
+    """The contents of a document or folder, kept apart so they can be filled in the order
+    KMLParser uses: documents, then folders, then placemarks"""
+
+    def __init__(self) -> None:
+        self.name = None
+        self.documents = []
+        self.folders = []
+        self.placemarks = []
+
+    def fill(self, result: dict, geometries: list) -> dict:
+        for document in self.documents:
+            document.fill(result, geometries)
+
+        for folder in self.folders:
+            result[folder.name] = folder.fill({}, geometries)
+
+        for name, idx in self.placemarks:
+            geometry = geometries[idx]
+            if name not in result:
+                result[name] = [geometry]
+            else:
+                result[name].append(geometry)
+
+        return result
+
+
+def _local_name(tag: str) -> str:
+    return tag.rpartition("}")[2]
+
+
+def _find(elem, path: list[str]):
+    """Returns the text of the element at path below elem, ignoring namespaces"""
+    for tag in path:
+        for child in elem:
+            if isinstance(child.tag, str) and _local_name(child.tag) == tag:
+                elem = child
+                break
+        else:
+            return None
+
+    return elem.text or ""
+
 
 class KMLParser:
+    """LEGACY: Reads the whole KML document with xmltodict, see parse_kml().
+
+    Kept as the fallback selected with parser = "legacy" in a kml data source, for documents
+    the streaming parser reads differently, and as the reference parse_kml() is tested and
+    benchmarked against."""
+
     result: dict | None
 
     def __init__(self, file: Path, root: str | None):
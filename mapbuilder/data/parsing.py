@@ -0,0 +1,102 @@
+"""Helpers shared by the streaming AIXM and KML parsers"""
+
+import numpy as np
+import shapely
+
+# Number of geometries built at once
+GEOMETRY_BATCH = 4096
+
+# Kinds of geometries built by GeometryBatch
+LINE = "line"
+RING = "ring"
+POINT = "point"
+
+
+def build_geometries(coords: np.ndarray, index: np.ndarray, rings: np.ndarray) -> np.ndarray:
+    """Builds linear rings and line strings in bulk from flat coordinates.
+    index holds the geometry index of every coordinate, rings flags which geometries are rings.
+    Geometries without coordinates are built empty."""
+    geometries = np.empty(len(rings), dtype=object)
+    counts = np.bincount(index, minlength=len(rings))
+
+    for is_ring, constructor, empty in (
+        (True, shapely.linearrings, shapely.LinearRing()),
+        (False, shapely.linestrings, shapely.LineString()),
+    ):
+        selected = rings == is_ring
+        # The bulk constructors need every geometry index to occur
+        geometries[selected & (counts == 0)] = empty
+        selected &= counts > 0
+        if not selected.any():
+            continue
+
+        # Map the geometry index of every coordinate to its position among the selected kind
+        position = np.cumsum(selected) - 1
+        coord_mask = selected[index]
+        geometries[selected] = constructor(coords[coord_mask], indices=position[index[coord_mask]])
+
+    return geometries
+
+
+class GeometryBatch:
+    """Collects the coordinates of geometries while parsing and builds them in bulk, a batch at
+    a time so the coordinate arrays do not pile up"""
+
+    def __init__(self, batch_size: int = GEOMETRY_BATCH) -> None:
+        self.batch_size = batch_size
+        self.geometries = []
+        self.kinds = []
+        self.coords = []
+
+    def add(self, kind: str, coords: np.ndarray) -> int:
+        """Adds the coordinates of a LINE, RING or POINT, returns the index of its geometry in
+        the list returned by build()"""
+        self.kinds.append(kind)
+        self.coords.append(coords)
+        if len(self.kinds) >= self.batch_size:
+            self.flush()
+
+        return len(self.geometries) + len(self.kinds) - 1
+
+    def flush(self) -> None:
+        kinds = np.array(self.kinds, dtype=object)
+        geometries = np.empty(len(kinds), dtype=object)
+
+        selected = np.flatnonzero(kinds != POINT)
+        if len(selected):
+            parts = [self.coords[idx] for idx in selected]
+            geometries[selected] = build_geometries(
+                np.concatenate(parts),
+                np.repeat(np.arange(len(parts)), [len(part) for part in parts]),
+                kinds[selected] == RING,
+            )
+
+        selected = np.flatnonzero(kinds == POINT)
+        if len(selected):
+            geometries[selected] = shapely.Point()
+            selected = [idx for idx in selected if len(self.coords[idx])]
+            if selected:
+                geometries[selected] = shapely.points(
+                    np.array([self.coords[idx][0] for idx in selected]),
+                )
+
+        self.geometries.extend(geometries)
+        self.kinds = []
+        self.coords = []
+
+    def build(self) -> list:
+        self.flush()
+        return self.geometries
+
+
+def release(elem) -> None:
+    """Frees a processed element and everything parsed before it, so memory stays flat"""
+    elem.clear(keep_tail=True)
+
+    for node in (elem, *elem.iterancestors()):
+        parent = node.getparent()
+        if parent is None:
+            break
+
+        while node.getprevious() is not None:
+            del parent[0]
@@ -1,45 +1,118 @@
+import hashlib
+import json
 import logging
-from collections.abc import Iterator
+import pickle
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import NamedTuple
 
-from mapbuilder.cache import Cache
-from mapbuilder.dfs.models import BaseItem, DFSDataset, GroupItem, LeafItem
+from mapbuilder.cache import Cache, Checksum
+from mapbuilder.dfs.models import Amdt, BaseItem, GroupItem, LeafItem
 
+# Bump whenever the index format changes, invalidates all stored indexes
+DFS_INDEX_VERSION = 1
 
-def get_dfs_datasets(cache: Cache) -> dict[int, dict[str, LeafItem]]:
-    """Retrieves the available DFS AIXM datasets"""
+
+class DatasetRelease(NamedTuple):
+    filename: str
+    checksum: Checksum
+
+
+# Amendment -> leaf dataset name -> release type -> release
+DatasetIndex = dict[int, dict[str, dict[str, DatasetRelease]]]
+
+
+def get_dfs_datasets(cache: Cache, amdt_ids: Iterable[int] | None = None) -> DatasetIndex:
+    """Retrieves the available DFS AIXM datasets of the given (default: all) amendments.
+
+    The releases are read from a compact index stored next to the cached catalogue. Only
+    amendments missing from the index are validated, and only once per catalogue file."""
     dataset_path = cache.get("dfs-aixm-rest", "https://aip.dfs.de/datasets/rest/", 48)
-    with dataset_path.open("r") as f:
-        json = f.read()
-
-    available_datasets = {}
-    try:
-        dataset = DFSDataset.model_validate_json(json)
-        for amdt in dataset.amdts:
-            amdt_idx = int(amdt.amdt)
-            available_datasets[amdt_idx] = {}
-            for ds in amdt.metadata.datasets:
-                for ld in get_leaf_datasets(ds):
-                    available_datasets[amdt_idx][ld.name] = ld
-            logging.debug(f"Read {len(available_datasets[amdt_idx])} DFS datasets for AMDT {amdt.amdt}")
-    except ValueError:
-        logging.exception("Cannot parse DFSDataset")
+    index_path = dataset_path.with_name(f"{dataset_path.name}.index")
+    index = _load_index(index_path, dataset_path)
+
+    wanted = None if amdt_ids is None else {int(amdt_id) for amdt_id in amdt_ids}
+    indexed = index["amdts"].keys()
+
+    if index["available"] is None:
+        pending = wanted
+    else:
+        available = set(index["available"])
+        pending = (available if wanted is None else wanted & available) - indexed
+
+    if index["available"] is None or pending:
+        _update_index(index, dataset_path, pending)
+        _store_index(index_path, index)
+
+    available_datasets = {
+        amdt_idx: leaves
+        for amdt_idx, leaves in index["amdts"].items()
+        if wanted is None or amdt_idx in wanted
+    }
+
+    for amdt_idx in sorted((wanted or set()) - available_datasets.keys()):
+        logging.error(f"DFS amendment {amdt_idx} is not available")
 
     return available_datasets
 
 
-def get_dfs_aixm_url(datasets: dict[str, LeafItem], amdt_id: int, dataset_name: str) -> str | None:
+# Dataset name -> release type -> release, the datasets of one amendment in a DatasetIndex.
+# LeafItems of the catalogue are accepted as well.
+AmdtDatasets = dict[str, dict[str, DatasetRelease] | LeafItem]
+
+
+def get_dfs_aixm_url(datasets: AmdtDatasets, amdt_id: int, dataset_name: str) -> str | None:
     """LEGACY: Returns the proper AIXM URL for the given datasets, amendment and dataset name"""
     return get_dfs_url(datasets, amdt_id, dataset_name, "AIXM 5.1.1")
 
 
-def get_dfs_url(datasets: dict[str, LeafItem], amdt_id: int, dataset_name: str, release_type: str) -> str | None:
-    """Retrieves the URL for a given dataset, amendment and dataset name"""
-    if dataset_name in datasets:
-        for release in datasets[dataset_name].releases:
-            if release.type == release_type:
-                return f"https://aip.dfs.de/datasets/rest/{amdt_id}/{release.filename}"
+def get_dfs_url(
+    datasets: AmdtDatasets,
+    amdt_id: int,
+    dataset_name: str,
+    release_type: str,
+) -> str | None:
+    """Retrieves the URL for a given dataset, amendment and dataset name. datasets are the
+    datasets of the amendment, see get_dfs_index_url to look the amendment up as well."""
+    release = get_dfs_release(datasets, dataset_name, release_type)
+    if release is None:
+        return None
+
+    return get_release_url(amdt_id, release)
+
+
+def get_dfs_index_url(
+    index: DatasetIndex,
+    amdt_id: int,
+    dataset_name: str,
+    release_type: str,
+) -> str | None:
+    """Retrieves the URL for a given dataset, amendment and dataset name from all amendments"""
+    return get_dfs_url(index.get(amdt_id, {}), amdt_id, dataset_name, release_type)
+
 
-    return None
+def get_dfs_release(
+    datasets: AmdtDatasets,
+    dataset_name: str,
+    release_type: str,
+) -> DatasetRelease | None:
+    """Retrieves the release of the given type for a dataset name"""
+    releases = datasets.get(dataset_name, {})
+    if isinstance(releases, LeafItem):
+        return next(
+            (
+                DatasetRelease(release.filename, (release.checksum.type, release.checksum.value))
+                for release in releases.releases
+                if release.type == release_type
+            ),
+            None,
+        )
+
+    return releases.get(release_type)
+
+
+def get_release_url(amdt_id: int, release: DatasetRelease) -> str:
+    return f"https://aip.dfs.de/datasets/rest/{amdt_id}/{release.filename}"
 
 
 def get_leaf_datasets(item: BaseItem) -> Iterator[LeafItem]:
@@ -52,3 +125,90 @@ def get_leaf_datasets(item: BaseItem) -> Iterator[LeafItem]:
         assert isinstance(item, LeafItem)
         if item.releases:
             yield item
+
+
+def _load_index(index_path: Path, dataset_path: Path) -> dict:
+    """Loads the index stored for the catalogue in dataset_path. Returns an empty index if there
+    is none or it was derived from a different catalogue."""
+    stat = dataset_path.stat()
+
+    if index_path.is_file():
+        try:
+            with index_path.open("rb") as f:
+                index = pickle.load(f)
+        except (
+            OSError,
+            EOFError,
+            ValueError,
+            AttributeError,
+            ImportError,
+            pickle.UnpicklingError,
+        ):
+            logging.warning(f"Cannot read DFS dataset index {index_path}, rebuilding.")
+        else:
+            if isinstance(index, dict) and index.get("version") == DFS_INDEX_VERSION:
+                # The catalogue is touched when revalidated, so compare the digest before
+                # discarding the index
+                if index["stat"] == [stat.st_mtime_ns, stat.st_size]:
+                    return index
+                if index["digest"] == _digest(dataset_path):
+                    index["stat"] = [stat.st_mtime_ns, stat.st_size]
+                    _store_index(index_path, index)
+                    return index
+
+    return {
+        "version": DFS_INDEX_VERSION,
+        "stat": [stat.st_mtime_ns, stat.st_size],
+        "digest": _digest(dataset_path),
+        "available": None,
+        "amdts": {},
+    }
+
+
+def _update_index(index: dict, dataset_path: Path, amdt_ids: set[int] | None) -> None:
+    """Validates the given (default: all) amendments of the catalogue and adds their releases
+    to the index"""
+    with dataset_path.open("r") as f:
+        try:
+            catalogue = json.load(f)
+            amdts = {int(amdt["Amdt"]): amdt for amdt in catalogue["Amdts"]}
+        except (ValueError, KeyError, TypeError):
+            logging.exception("Cannot parse DFSDataset")
+            return
+
+    index["available"] = sorted(amdts)
+
+    for amdt_idx, raw_amdt in amdts.items():
+        if amdt_ids is not None and amdt_idx not in amdt_ids:
+            continue
+
+        try:
+            amdt = Amdt.model_validate(raw_amdt)
+        except ValueError:
+            logging.exception(f"Cannot parse DFS amendment {amdt_idx}")
+            continue
+
+        leaves = {}
+        for ds in amdt.metadata.datasets:
+            for ld in get_leaf_datasets(ds):
+                leaves[ld.name] = {
+                    release.type: DatasetRelease(
+                        release.filename,
+                        (release.checksum.type, release.checksum.value),
+                    )
+                    for release in ld.releases
+                }
+        index["amdts"][amdt_idx] = leaves
+        logging.debug(f"Read {len(leaves)} DFS datasets for AMDT {amdt.amdt}")
+
+
+def _store_index(index_path: Path, index: dict) -> None:
+    tmp_path = index_path.with_name(f"{index_path.name}.tmp")
+    with tmp_path.open("wb") as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp_path.replace(index_path)
+
+
+def _digest(file: Path) -> str:
+    with file.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
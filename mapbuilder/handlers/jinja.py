@@ -1,28 +1,74 @@
-from itertools import chain
+from collections import Counter
+from collections.abc import Iterator
+from itertools import pairwise
 from pathlib import Path
 
 import numpy as np
 import shapely
 import shapely.ops
-from jinja2 import Environment, FileSystemLoader
-from more_itertools import unique_everseen
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from jinja2.bccache import Bucket
 from shapely import Geometry, Polygon
 
 from mapbuilder.data.aixm2 import AIXMFeature
 from mapbuilder.utils.ad import render_cl, render_runways
 from mapbuilder.utils.ecl import draw_ecl_dashes, draw_loc_tick, draw_marker_ticks
-from mapbuilder.utils.geo import brg, fix
+from mapbuilder.utils.geo import SectorLines, brg, fix
+from mapbuilder.utils.memo import LRUCache, memoize
 from mapbuilder.utils.sidstar import render_sid
+from mapbuilder.utils.spatial import intersecting, near, within
+
+# Number of results kept per memoized geometry function. The same apron, taxiway and guidance
+# line sets are processed for many profiles and aliases.
+COMBINE_CACHE_SIZE = 128
+FILTER_CACHE_SIZE = 256
+
+
+class CountingBytecodeCache(FileSystemBytecodeCache):
+    """A filesystem bytecode cache keeping track of how many templates were loaded from the cache
+    and how many had to be compiled."""
+
+    def __init__(self, directory: Path) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        super().__init__(str(directory))
+        self.stats = Counter()
+
+    def load_bytecode(self, bucket: Bucket) -> None:
+        super().load_bytecode(bucket)
+        self.stats["cached" if bucket.code is not None else "compiled"] += 1
 
 
 class JinjaHandler:
-    def __init__(self, data, config):
+    def __init__(self, data, config, cache_dir: Path | None = None):
         self.data = data
         self.config = config
+        # One environment per template directory, shared by all profiles of a build
+        self.environments: dict[Path, Environment] = {}
+        self.bytecode_cache = CountingBytecodeCache(cache_dir) if cache_dir is not None else None
+
+    @property
+    def stats(self) -> Counter:
+        """Counts templates compiled from source and loaded from the bytecode cache"""
+        return self.bytecode_cache.stats if self.bytecode_cache is not None else Counter()
 
     def handle(self, item: Path) -> str:
-        file_loader = FileSystemLoader(item.parent)
-        jinja_env = Environment(loader=file_loader)
+        return self.environment(item.parent).get_template(item.name).render()
+
+    def stream(self, item: Path) -> Iterator[str]:
+        """Renders a template chunk by chunk"""
+        return self.environment(item.parent).get_template(item.name).generate()
+
+    def environment(self, directory: Path) -> Environment:
+        if directory not in self.environments:
+            self.environments[directory] = self.create_environment(directory)
+
+        return self.environments[directory]
+
+    def create_environment(self, directory: Path) -> Environment:
+        jinja_env = Environment(
+            loader=FileSystemLoader(directory),
+            bytecode_cache=self.bytecode_cache,
+        )
         jinja_env.globals.update(
             data=self.data,
             runways=self.config["runways"],
@@ -40,6 +86,11 @@ class JinjaHandler:
             render_sectorlines=render_sectorlines,
             sector_sub=sector_sub,
             sector_and=sector_and,
+            sector_or=sector_or,
+            sector_lines=SectorLines,
+            within=within,
+            near=near,
+            intersecting=intersecting,
         )
         jinja_env.filters.update(
             geoms=geoms,
@@ -53,9 +104,12 @@ class JinjaHandler:
             to_text=to_text,
             to_text_buffer=to_text_buffer,
             to_symbol=to_symbol,
+            within=within,
+            near=near,
+            intersecting=intersecting,
         )
 
-        return jinja_env.get_template(item.name).render()
+        return jinja_env
 
 
 def geoms(features: list[AIXMFeature] | AIXMFeature) -> list[Geometry]:
@@ -68,10 +122,28 @@ def geoms(features: list[AIXMFeature] | AIXMFeature) -> list[Geometry]:
     return result
 
 
-def combine(geometries: list[Geometry]) -> Geometry:
-    combined = shapely.ops.unary_union([Polygon(geo) for geo in geometries])
-    # combined = shapely.ops.unary_union(geometries)
-    #   return combined.exterior
+@memoize(LRUCache(COMBINE_CACHE_SIZE, "combine"))
+def combine(
+    geometries: list[Geometry],
+    grid_size: float | None = None,
+    coverage: bool = False,
+) -> Geometry:
+    """Unites the areas enclosed by the given rings. With grid_size, coordinates are snapped to
+    a grid of that size. Set coverage if the areas do not overlap (e.g. apron elements), which
+    allows a much faster union."""
+    geometries = list(geometries)
+    polygons = np.empty(len(geometries), dtype=object)
+    rings = shapely.get_type_id(geometries) == shapely.GeometryType.LINEARRING
+    polygons[rings] = shapely.polygons(np.array(geometries, dtype=object)[rings])
+    polygons[~rings] = [
+        Polygon(geo) for geo, ring in zip(geometries, rings, strict=True) if not ring
+    ]
+
+    if coverage:
+        combined = shapely.coverage_union_all(polygons)
+    else:
+        combined = shapely.union_all(polygons, grid_size=grid_size)
+
     return shapely.buffer(combined, 0.00000000000001)
 
 
@@ -168,6 +240,7 @@ def to_coordline(geometries, designator: str):
     return "\n".join(lines)
 
 
+@memoize(LRUCache(FILTER_CACHE_SIZE, "filter_smaller_than"))
 def filter_smaller_than(geometries, threshold):
     geo = _get_geoms(geometries)
     if isinstance(geo, list):
@@ -189,47 +262,70 @@ def to_poly(geometries, designator: str, color: str | None = None, coordpoly=Fal
     return "\n".join(lines)
 
 
+SIMPLE_GEOMETRY_TYPES = [
+    shapely.GeometryType.POINT,
+    shapely.GeometryType.LINESTRING,
+    shapely.GeometryType.LINEARRING,
+]
+
+
+def _coord_strings(geometries) -> tuple[list[str], list[int]]:
+    """Formats the coordinates of all geometries as lat:lon at once.
+    Returns the formatted coordinates and the offsets of each geometry into them. Only points,
+    line strings and linear rings have a single coordinate sequence, other geometries have to be
+    split into their parts first."""
+    geometries = list(geometries)
+    types = shapely.get_type_id(geometries)
+    unsupported = ~np.isin(types, SIMPLE_GEOMETRY_TYPES)
+    if unsupported.any():
+        geometry = geometries[np.flatnonzero(unsupported)[0]]
+        msg = f"Cannot render the coordinates of {getattr(geometry, 'geom_type', geometry)}"
+        raise TypeError(msg)
+
+    coords, index = shapely.get_coordinates(geometries, return_index=True)
+    counts = np.bincount(index, minlength=len(geometries))
+    offsets = np.concatenate(([0], np.cumsum(counts))).tolist()
+
+    return [f"{lat}:{lon}" for lat, lon in coords.tolist()], offsets
+
+
 def _render_polygon(lines, polygons, color=None, coordpoly=False):
     if not coordpoly and color is not None:
         lines.append(f"COLOR:{color}")
     else:
         lines.append("")
 
-    for polygon in polygons:
-        if coordpoly:
-            if color is not None:
-                lines.append(f"COLOR:{color}")
-            else:
-                lines.append("")
-        else:
-            lines.append("COORDTYPE:OTHER:REGION")
-        for point in polygon.coords:
-            lines.append(f"COORD:{coord2es((point[0], point[1]))}")
+    if coordpoly:
+        header = f"COLOR:{color}" if color is not None else ""
+    else:
+        header = "COORDTYPE:OTHER:REGION"
 
+    points, offsets = _coord_strings(polygons)
+    for start, end in pairwise(offsets):
+        lines.append(header)
+        lines.extend([f"COORD:{point}" for point in points[start:end]])
 
-def _render_coords(lines, linestring):
-    for geometry in linestring:
-        for point in geometry.coords:
-            lines.append(f"COORD:{point[0]}:{point[1]}")
 
+def _render_coords(lines, linestring):
+    points, offsets = _coord_strings(linestring)
+    for start, end in pairwise(offsets):
+        lines.extend([f"COORD:{point}" for point in points[start:end]])
         lines.append("")
 
 
 def _render_linestring(lines, linestring):
-    for geometry in linestring:
-        count = len(geometry.coords)
-
-        for idx, point in enumerate(geometry.coords):
-            if idx == count - 1:
-                break
-
-            lines.append(
-                f"LINE:{coord2es((point[0], point[1]))}"
-                f":{coord2es((geometry.coords[idx + 1][0], geometry.coords[idx + 1][1]))}",
+    points, offsets = _coord_strings(linestring)
+    for start, end in pairwise(offsets):
+        lines.extend([
+            f"LINE:{point}:{next_point}"
+            for point, next_point in zip(
+                points[start : end - 1], points[start + 1 : end], strict=True
             )
+        ])
         lines.append("")
 
 
+@memoize(LRUCache(FILTER_CACHE_SIZE, "simplify"))
 def simplify(geometries, tolerance):
     geo = _get_geoms(geometries)
     if isinstance(geo, list):
@@ -238,6 +334,7 @@ def simplify(geometries, tolerance):
         return shapely.simplify(geo, tolerance)
 
 
+@memoize(LRUCache(FILTER_CACHE_SIZE, "join_segments"))
 def join_segments(lines):
     return shapely.ops.linemerge(_get_geoms(lines))
 
@@ -247,13 +344,18 @@ def coord2es(coord):
 
 
 def render_sectorlines(*lines):
-    unique_lines = list(unique_everseen(chain(*lines)))
-    return "\n".join(map(str, unique_lines))
+    return str(SectorLines(*lines))
 
 
 def sector_sub(a, b):
-    return [item for item in a if item not in b]
+    lines = SectorLines(b)
+    return [item for item in a if item not in lines]
 
 
 def sector_and(a, b):
-    return [item for item in a if item in b]
+    lines = SectorLines(b)
+    return [item for item in a if item in lines]
+
+
+def sector_or(*lines) -> SectorLines:
+    return SectorLines(*lines)
@@ -1,7 +1,15 @@
+from collections.abc import Iterator
 from pathlib import Path
 
+CHUNK_SIZE = 64 * 1024
+
 
 class PlainTextHandler:
     def handle(self, item: Path) -> str:
         with item.open(encoding="iso-8859-1") as input:
             return input.read()
+
+    def stream(self, item: Path) -> Iterator[str]:
+        with item.open(encoding="iso-8859-1") as input:
+            while chunk := input.read(CHUNK_SIZE):
+                yield chunk
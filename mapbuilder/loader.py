@@ -0,0 +1,327 @@
+import logging
+import re
+import threading
+from collections.abc import Callable, Iterator, Mapping
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from . import profiling
+from .data.aixm2 import parse_aixm
+from .data.aixm_cache import parse_aixm_cached
+from .data.kml import KMLParser, parse_kml
+from .data.rwy import parse_runway
+from .data.sectors import parse_sectors, sectors_to_lines
+from .data.sidstar import parse_sidstar
+from .utils.geojson import FeatureStream, load_geojson, load_geojson_features
+from .utils.geopackage import load_geopackage
+from .utils.spatial import register as register_spatial_index
+from .utils.spatial import unregister as unregister_spatial_index
+
+# Data source types whose data is spatially indexed once loaded
+INDEXED_TYPES = ["aixm", "kml", "geojson"]
+# Data source types keeping the (lon, lat) order of their files instead of (lat, lon)
+LON_LAT_TYPES = ["geojson"]
+
+EXECUTORS = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+
+
+class DataSourceError(Exception):
+    """Raised when one or more data sources failed to load"""
+
+    def __init__(self, failures: dict[str, BaseException]) -> None:
+        self.failures = failures
+        super().__init__(f"Failed to load data sources: {', '.join(failures)}")
+
+
+def load_data_source(name: str, source_config: dict, source: Path, cache_dir: Path | None = None):
+    """Loads a single data source from an already resolved source path. Parsed data may be
+    cached in cache_dir. Returns None for unknown data source types."""
+    with profiling.span(f"load {name}", "data", type=source_config["type"]):
+        return _parse_data_source(name, source_config, source, cache_dir)
+
+
+def _load_in_process(
+    name: str,
+    source_config: dict,
+    source: Path,
+    cache_dir: Path | None,
+    profile_origin: int | None,
+) -> tuple[object, list[dict]]:
+    """Loads a data source in a worker process, returns its data and the profiling events"""
+    if profile_origin is not None:
+        profiling.enable(profile_origin)
+
+    return load_data_source(name, source_config, source, cache_dir), profiling.collect()
+
+
+def _parse_data_source(name: str, source_config: dict, source: Path, cache_dir: Path | None):
+    data_source_type = source_config["type"]
+
+    if data_source_type == "aixm":
+        logging.debug(f"Loading AIXM source {name}...")
+        if cache_dir is not None and source_config.get("cache", True):
+            return parse_aixm_cached(source, cache_dir / _cache_name(f"parsed-aixm-{name}"))
+        return parse_aixm(source)
+    elif data_source_type == "kml":
+        logging.debug(f"Loading KML source {name}...")
+        if source_config.get("parser") == "legacy":
+            return KMLParser(source, source_config.get("root")).parse()
+        return parse_kml(source, source_config.get("root"))
+    elif data_source_type == "raw":
+        logging.debug(f"Loading raw source {name}...")
+        with source.open(encoding="iso-8859-1") as f:
+            return f.read()
+    elif data_source_type == "ese":
+        logging.debug(f"Loading ESE source {name}...")
+        return {"SIDSTAR": parse_sidstar(source)}
+    elif data_source_type == "sct":
+        logging.debug(f"Loading SCT source {name}...")
+        return {"RUNWAY": parse_runway(source)}
+    elif data_source_type == "sectors":
+        logging.debug(f"Loading sectors source {name}...")
+        fixes = parse_sectors(source)
+        return {
+            "fixes": fixes,
+            "lines": sectors_to_lines(fixes),
+        }
+    elif data_source_type == "gpkg":
+        logging.debug(f"Loading GeoPackage source {name}...")
+        return load_geopackage(
+            source, source_config["layers"], source_config.get("columnar", False)
+        )
+    elif data_source_type == "geojson":
+        logging.debug(f"Loading GeoJSON source {name}...")
+        if source_config.get("iterate", False):
+            return FeatureStream(source)
+        if source_config.get("stream", False) or "group_by" in source_config:
+            return load_geojson_features(source, source_config.get("group_by"))
+        return load_geojson(source)
+
+    logging.error(f"Unknown data source type for data source {name}")
+    return None
+
+
+class ParallelLoader:
+    """Loads independent data sources concurrently.
+
+    With the thread executor, the source resolver (which may download remote sources) runs in
+    the workers as well. With the process executor, sources are resolved in the parent process
+    first and only the parsing is done by the workers, so loaded data must be picklable."""
+
+    def __init__(
+        self,
+        workers: int = 1,
+        executor: str = "thread",
+        cache_dir: Path | None = None,
+    ) -> None:
+        if executor not in EXECUTORS:
+            msg = f"Unknown executor {executor}, expected one of {', '.join(EXECUTORS)}"
+            raise ValueError(msg)
+
+        self.workers = max(1, workers)
+        self.executor = executor
+        self.cache_dir = cache_dir
+
+    def load(
+        self,
+        sources: dict[str, dict],
+        resolve: Callable[[str, dict], Path | None],
+    ) -> dict:
+        """Loads all given data sources, using resolve to determine each source path.
+        Failures are logged per source and raised as a DataSourceError once all sources are
+        done."""
+        result = {}
+        failures = {}
+
+        if self.workers == 1:
+            for name, source_config in sources.items():
+                try:
+                    data = _resolve_and_load(name, source_config, resolve, self.cache_dir)
+                except Exception as e:  # noqa: BLE001
+                    failures[name] = e
+                    _report_failure(name, e)
+                    continue
+
+                if data is not None:
+                    result[name] = data
+        else:
+            logging.debug(
+                f"Loading {len(sources)} data sources using {self.workers} {self.executor} "
+                f"workers...",
+            )
+            futures: dict[str, Future] = {}
+            with EXECUTORS[self.executor](max_workers=self.workers) as executor:
+                for name, source_config in sources.items():
+                    if self.executor == "thread":
+                        futures[name] = executor.submit(
+                            _resolve_and_load, name, source_config, resolve, self.cache_dir
+                        )
+                        continue
+
+                    try:
+                        source = resolve(name, source_config)
+                    except Exception as e:  # noqa: BLE001
+                        failures[name] = e
+                        _report_failure(name, e)
+                        continue
+
+                    if source is not None:
+                        futures[name] = executor.submit(
+                            _load_in_process,
+                            name,
+                            source_config,
+                            source,
+                            self.cache_dir,
+                            profiling.origin(),
+                        )
+
+            # Collect in configuration order so that self.data stays deterministic
+            for name, future in futures.items():
+                try:
+                    data = future.result()
+                except Exception as e:  # noqa: BLE001
+                    failures[name] = e
+                    _report_failure(name, e)
+                    continue
+
+                if self.executor == "process":
+                    data, events = data
+                    profiling.merge(events)
+
+                if data is not None:
+                    result[name] = data
+
+        if failures:
+            raise DataSourceError(failures)
+
+        return result
+
+
+class DataSources(Mapping):
+    """A mapping of data source names to their data. Each source is loaded the first time it is
+    accessed (e.g. by a template using data[...]), so builds only pay for the sources they use."""
+
+    def __init__(
+        self,
+        sources: dict[str, dict],
+        resolve: Callable[[str, dict], Path | None],
+        cache_dir: Path | None = None,
+    ) -> None:
+        # Attributes are private so they do not shadow data source names in templates
+        self._sources = sources
+        self._resolve = resolve
+        self._cache_dir = cache_dir
+        self._loaded = {}
+        self._failed = {}
+        self._lock = threading.Lock()
+        self._used = None
+
+    def __getitem__(self, name: str):
+        if name in self._sources and self._used is not None:
+            self._used.add(name)
+
+        if name in self._loaded:
+            return self._loaded[name]
+
+        if name not in self._sources:
+            raise KeyError(name)
+
+        with self._lock:
+            if name not in self._loaded:
+                if name in self._failed:
+                    raise DataSourceError({name: self._failed[name]})
+
+                try:
+                    data = _resolve_and_load(
+                        name, self._sources[name], self._resolve, self._cache_dir
+                    )
+                except Exception as e:
+                    self._failed[name] = e
+                    _report_failure(name, e)
+                    raise DataSourceError({name: e}) from e
+
+                if data is None:
+                    raise KeyError(name)
+
+                self.__store(name, data)
+
+        return self._loaded[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._sources)
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def __contains__(self, name) -> bool:
+        return name in self._sources
+
+    @contextmanager
+    def track(self) -> Iterator[set[str]]:
+        """Records the names of all data sources accessed within the context"""
+        used = set()
+        previous, self._used = self._used, used
+        try:
+            yield used
+        finally:
+            self._used = previous
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+    def invalidate(self, name: str) -> None:
+        """Forgets the data (or the failure) of a data source, it is loaded again on next use"""
+        with self._lock:
+            data = self._loaded.pop(name, None)
+            self._failed.pop(name, None)
+
+        if data is not None and self._sources[name]["type"] in INDEXED_TYPES:
+            unregister_spatial_index(data)
+
+    def preload(self, loader: ParallelLoader, names: list[str] | None = None) -> None:
+        """Loads the given (default: all) data sources that are not loaded yet using loader."""
+        pending = {
+            name: source_config
+            for name, source_config in self._sources.items()
+            if (names is None or name in names) and name not in self._loaded
+        }
+
+        if pending:
+            with self._lock:
+                for name, data in loader.load(pending, self._resolve).items():
+                    self.__store(name, data)
+
+    def __store(self, name: str, data) -> None:
+        data_source_type = self._sources[name]["type"]
+        # Streamed features are not held, indexing them would read them all
+        if data_source_type in INDEXED_TYPES and not isinstance(data, FeatureStream):
+            register_spatial_index(data, data_source_type in LON_LAT_TYPES)
+
+        self._loaded[name] = data
+
+
+def _resolve_and_load(
+    name: str,
+    source_config: dict,
+    resolve: Callable[[str, dict], Path | None],
+    cache_dir: Path | None,
+):
+    source = resolve(name, source_config)
+    if source is None:
+        return None
+
+    return load_data_source(name, source_config, source, cache_dir)
+
+
+def _cache_name(item: str) -> str:
+    """Returns a file name usable in the cache directory for a given item"""
+    return re.sub(r'[\\/:\*\?"<>\|]', "", item)
+
+
+def _report_failure(name: str, e: BaseException) -> None:
+    logging.error(f"Failed to load data source {name}: {e}")
+    logging.debug(f"Traceback for data source {name}", exc_info=e)
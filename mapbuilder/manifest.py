@@ -0,0 +1,85 @@
+import hashlib
+import importlib.metadata
+import json
+import logging
+from pathlib import Path
+
+MANIFEST_FILE = ".mapbuilder-manifest.json"
+# Bump whenever the fingerprint format changes, invalidates all recorded targets
+MANIFEST_VERSION = 2
+
+try:
+    # Another mapbuilder version may render the same inputs differently
+    PACKAGE_VERSION = importlib.metadata.version("mapbuilder")
+except importlib.metadata.PackageNotFoundError:
+    # Run from a source tree
+    PACKAGE_VERSION = None
+
+
+class Manifest:
+    """Records the dependency fingerprints of built targets, so unchanged targets can be skipped
+    on the next build. Also remembers file digests by modification time and size, so unchanged
+    (large) files do not have to be hashed again."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.targets = {}
+        self.files = {}
+        self.seen_files = set()
+
+        if path.is_file():
+            try:
+                with path.open("r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except ValueError:
+                logging.warning(f"Cannot read build manifest {path}, rebuilding all targets.")
+                return
+
+            if manifest.get("version") == MANIFEST_VERSION:
+                self.targets = manifest.get("targets", {})
+                self.files = manifest.get("files", {})
+
+    def digest(self, file: Path) -> str:
+        """Returns the SHA-256 digest of a file's contents"""
+        stat = file.stat()
+        key = str(file.resolve())
+        self.seen_files.add(key)
+        cached = self.files.get(key)
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+
+        with file.open("rb") as f:
+            digest = hashlib.file_digest(f, "sha256").hexdigest()
+
+        self.files[key] = [stat.st_mtime_ns, stat.st_size, digest]
+        return digest
+
+    def entry(self, target: str) -> dict | None:
+        return self.targets.get(target)
+
+    def record(self, target: str, inputs: str, data: dict[str, str]) -> None:
+        self.targets[target] = {"inputs": inputs, "data": data}
+
+    def forget(self, target: str) -> None:
+        self.targets.pop(target, None)
+
+    def save(self) -> None:
+        # Only keep digests of files still in use, so removed files do not pile up
+        files = {key: value for key, value in self.files.items() if key in self.seen_files}
+
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(
+                {"version": MANIFEST_VERSION, "targets": self.targets, "files": files},
+                f,
+                indent=1,
+                sort_keys=True,
+            )
+        tmp_path.replace(self.path)
+
+
+def fingerprint(*parts) -> str:
+    """Returns a digest over JSON-serializable parts"""
+    return hashlib.sha256(
+        json.dumps(parts, sort_keys=True, default=str).encode("utf-8"),
+    ).hexdigest()
@@ -0,0 +1,198 @@
+"""Optional build profiling: spans with wall time and peak memory, exported as Chrome trace-event
+JSON (chrome://tracing, https://ui.perfetto.dev).
+
+Profiling is off unless enable() is called, span() then returns a shared no-op context, so the
+instrumented code pays next to nothing. Spans are recorded per process and thread. Memory is
+measured with tracemalloc, which is process wide: the peak of a span is the highest traced memory
+while it was open, relative to the memory in use when it started. Whenever the tracemalloc peak
+is reset, it is first handed to all open spans, so enclosing spans include the peaks of nested
+ones (and, with concurrent threads, of everything running alongside them).
+
+Forked workers start with an empty profiler and return their events with collect(), the parent
+adds them with merge()."""
+
+import json
+import operator
+import os
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+DEFAULT_TOP = 10
+
+# Order of the categories in the summary, others follow alphabetically
+SUMMARY_CATEGORIES = ("target", "item", "data", "fetch")
+
+_NO_SPAN = nullcontext()
+
+
+class _Frame:
+    def __init__(self, start_memory: int) -> None:
+        self.start_memory = start_memory
+        self.peak = start_memory
+
+
+class Profiler:
+    def __init__(self, origin: int | None = None) -> None:
+        # Timestamps are relative to origin (perf_counter_ns), shared with forked workers
+        self.origin = time.perf_counter_ns() if origin is None else origin
+        self.events: list[dict] = []
+        self.frames: set[_Frame] = set()
+        self.lock = threading.Lock()
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def span(self, name: str, category: str, args: dict) -> Iterator[None]:
+        with self.lock:
+            self.__checkpoint()
+            frame = _Frame(tracemalloc.get_traced_memory()[0])
+            self.frames.add(frame)
+
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            with self.lock:
+                self.__checkpoint()
+                self.frames.discard(frame)
+                self.events.append({
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": (start - self.origin) / 1000,
+                    "dur": (end - start) / 1000,
+                    "pid": os.getpid(),
+                    "tid": threading.get_native_id(),
+                    "args": {**args, "peak_memory": frame.peak - frame.start_memory},
+                })
+
+    def __checkpoint(self) -> None:
+        """Hands the current tracemalloc peak to all open spans and starts a new peak"""
+        peak = tracemalloc.get_traced_memory()[1]
+        for frame in self.frames:
+            frame.peak = max(frame.peak, peak)
+        tracemalloc.reset_peak()
+
+    def collect(self) -> list[dict]:
+        """Returns the events recorded so far and forgets them"""
+        with self.lock:
+            events, self.events = self.events, []
+
+        return events
+
+    def merge(self, events: list[dict]) -> None:
+        with self.lock:
+            self.events.extend(events)
+
+    def trace(self) -> dict:
+        """Returns the recorded events as Chrome trace-event JSON data"""
+        with self.lock:
+            events = sorted(self.events, key=operator.itemgetter("ts"))
+
+        pids = sorted({event["pid"] for event in events})
+        metadata = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": pid,
+                "args": {"name": "mapbuilder" if pid == os.getpid() else f"worker {pid}"},
+            }
+            for pid in pids
+        ]
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+
+    def summary(self, top: int = DEFAULT_TOP) -> list[str]:
+        """Returns a table of the top slowest spans of each category. Spans of different
+        categories nest (a target contains its items), so they are only ranked among their own
+        category."""
+        with self.lock:
+            events = sorted(self.events, key=operator.itemgetter("dur"), reverse=True)
+
+        categories = {}
+        for event in events:
+            categories.setdefault(event["cat"], [])
+            if len(categories[event["cat"]]) < top:
+                categories[event["cat"]].append(event)
+
+        if not categories:
+            return []
+
+        order = [category for category in SUMMARY_CATEGORIES if category in categories]
+        order.extend(sorted(categories.keys() - set(SUMMARY_CATEGORIES)))
+        width = max(len(event["name"]) for group in categories.values() for event in group)
+        lines = [f"{'Span':<{width}}  {'Category':<8}  {'Time (s)':>9}  {'Peak (MiB)':>10}"]
+        for category in order:
+            lines.extend(
+                f"{event['name']:<{width}}  {event['cat']:<8}  {event['dur'] / 1e6:9.3f}  "
+                f"{event['args']['peak_memory'] / 2**20:10.1f}"
+                for event in categories[category]
+            )
+
+        return lines
+
+
+_profiler: Profiler | None = None
+
+
+def enable(origin: int | None = None) -> Profiler:
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler(origin)
+
+    return _profiler
+
+
+def is_enabled() -> bool:
+    return _profiler is not None
+
+
+def origin() -> int | None:
+    return _profiler.origin if _profiler is not None else None
+
+
+def span(name: str | Callable[[], str], category: str, **args):
+    """Records the enclosed code as a span, if profiling is enabled. The name may be given as a
+    function, so it is only computed then."""
+    if _profiler is None:
+        return _NO_SPAN
+
+    return _profiler.span(name() if callable(name) else name, category, args)
+
+
+def collect() -> list[dict]:
+    return _profiler.collect() if _profiler is not None else []
+
+
+def merge(events: list[dict]) -> None:
+    if _profiler is not None and events:
+        _profiler.merge(events)
+
+
+def write(path: Path) -> None:
+    """Writes the recorded spans as Chrome trace-event JSON"""
+    if _profiler is None:
+        return
+
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(_profiler.trace(), f)
+
+
+def summary(top: int = DEFAULT_TOP) -> list[str]:
+    return _profiler.summary(top) if _profiler is not None else []
+
+
+def _after_fork() -> None:
+    # Spans open in the parent are not closed in the child, and its events stay with the parent
+    if _profiler is not None:
+        _profiler.events = []
+        _profiler.frames = set()
+        _profiler.lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
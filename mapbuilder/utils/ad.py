@@ -1,24 +1,37 @@
+from mapbuilder.utils import geodesy
+from mapbuilder.utils.geo import NM_IN_METERS, Fix, Line
+
+
 def render_runways(ad: dict, length: float = 1.5, exclude: list | None = None) -> str:
     if exclude is None:
         exclude = []
-    lines = []
 
-    for rwy_id, data in ad.items():
-        if rwy_id in exclude:
-            continue
+    runways = [
+        data
+        for rwy_id, data in ad.items()
+        if rwy_id not in exclude and not (data["brg1"] == 0 and data["brg2"] == 0)
+    ]
 
-        if data["brg1"] == 0 and data["brg2"] == 0:
-            continue
+    starts = geodesy.destinations(
+        [data["center"].coords() for data in runways],
+        length / 2 * NM_IN_METERS,
+        [data["brg2"] for data in runways],
+    )
+    ends = geodesy.destinations(
+        starts,
+        length * NM_IN_METERS,
+        [data["brg1"] for data in runways],
+    )
 
-        lines.append(str(data["center"].move_to(length / 2, data["brg2"]).line_to(length, data["brg1"])))
-
-    return "\n".join(lines)
+    return "\n".join(str(Line(start, end)) for start, end in zip(starts, ends, strict=True))
 
 
 def render_cl(ad: dict) -> str:
     lines = []
 
     for _, data in ad.items():
-        lines.append(str(data["thr1"].line_to_fix(data["thr2"])))
+        # Start from a fresh fix, line_to_fix() would otherwise record the line on the shared
+        # threshold and leak it into every subsequent render
+        lines.append(str(Fix(data["thr1"].coords()).line_to_fix(data["thr2"])))
 
     return "\n".join(lines)
@@ -1,17 +1,15 @@
-from mapbuilder.utils.geo import Brg, Fix, back_bearing
+from mapbuilder.utils import geodesy
+from mapbuilder.utils.geo import NM_IN_METERS, Brg, Fix, Line, back_bearing
 
 
 def extrapolate_rwy(rwy_info, count: int, dist: float = 1) -> list[Fix]:
     """Extrapolates count points from the runway threshold, each spaced dist nautical miles apart
     from each other."""
     thr = Fix(rwy_info["thr"])
-    points = [thr]
     brg = back_bearing(rwy_info["bearing"])
+    distances = [(step + 1) * dist * NM_IN_METERS for step in range(0, count)]
 
-    for step in range(0, count):
-        points.append(thr.move_to(dist=(step + 1) * dist, bearing=brg))
-
-    return points
+    return [thr, *(Fix(point) for point in geodesy.destinations([thr.coords()], distances, brg))]
 
 
 def draw_ecl_dashes(rwy_info, count: int, dist: float = 1, start_blank: bool = True):
@@ -34,15 +32,24 @@ def draw_loc_tick(rwy_info, gap: float, length: float):
 
 
 def draw_marker_ticks(rwy_info, at: list, gap: float, length: float):
-    lines = []
     brg = Brg(rwy_info["bearing"]).invert()
     tick_brg = brg + 90
-    for dist in at:
-        base = Fix(rwy_info["thr"]).move_to(dist, brg)
 
-        lines.extend((
-            str(base.move_to(gap, tick_brg).line_to(length, tick_brg)),
-            str(base.move_to(-gap, tick_brg).line_to(-length, tick_brg)),
-        ))
-
-    return "\n".join(lines)
+    # One tick on either side of each marker, computed in bulk level by level
+    bases = geodesy.destinations(
+        [Fix(rwy_info["thr"]).coords()],
+        [dist * NM_IN_METERS for dist in at],
+        brg.brg,
+    )
+    starts = geodesy.destinations(
+        [base for base in bases for _ in range(2)],
+        [gap * NM_IN_METERS, -gap * NM_IN_METERS] * len(bases),
+        tick_brg.brg,
+    )
+    ends = geodesy.destinations(
+        starts,
+        [length * NM_IN_METERS, -length * NM_IN_METERS] * len(bases),
+        tick_brg.brg,
+    )
+
+    return "\n".join(str(Line(start, end)) for start, end in zip(starts, ends, strict=True))
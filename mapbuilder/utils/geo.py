@@ -1,5 +1,10 @@
+from collections.abc import Collection, Iterable, Iterator, Sequence
+from itertools import chain
+
 from pygeodesy import ellipsoidalExact as geo_model
 
+from mapbuilder.utils import geodesy
+
 NM_IN_METERS = 1852
 
 
@@ -72,13 +77,13 @@ class Fix:
         return coord2es(self.fix)
 
     def move_to(self, dist: float, bearing: float | Brg) -> "Fix":
-        return Fix(self.fix.destination(dist * NM_IN_METERS, _brg(bearing)), self.lines)
+        return Fix(geodesy.destination(self.fix, dist * NM_IN_METERS, _brg(bearing)), self.lines)
 
     def move_to_fix(self, fix: "Fix") -> "Fix":
         return Fix(fix.fix, self.lines)
 
     def line_to(self, dist: float, bearing: float | Brg) -> "Fix":
-        dest = self.fix.destination(dist * NM_IN_METERS, _brg(bearing))
+        dest = geodesy.destination(self.fix, dist * NM_IN_METERS, _brg(bearing))
         self.lines.append(f"LINE:{coord2es(self.fix)}:{coord2es(dest)}")
         return Fix(self.fix, self.lines)
 
@@ -87,7 +92,7 @@ class Fix:
         return Fix(self.fix, self.lines)
 
     def line_move_to(self, dist: float, bearing: float | Brg) -> "Fix":
-        dest = self.fix.destination(dist * NM_IN_METERS, _brg(bearing))
+        dest = geodesy.destination(self.fix, dist * NM_IN_METERS, _brg(bearing))
         self.lines.append(f"LINE:{coord2es(self.fix)}:{coord2es(dest)}")
         self.fix = dest
         return Fix(self.fix, self.lines)
@@ -109,9 +114,74 @@ class Line:
         self.a = a
         self.b = b
 
+    @property
+    def key(self) -> tuple:
+        """A direction independent key, lines between the same points have the same key"""
+        a = (float(self.a.lat), float(self.a.lon))
+        b = (float(self.b.lat), float(self.b.lon))
+        return (a, b) if a <= b else (b, a)
+
     def __eq__(self, other):
-        return ((self.a == other.a and self.b == other.b)
-                or (self.a == other.b and self.b == other.a))
+        if not isinstance(other, Line):
+            return NotImplemented
+
+        return self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
 
     def __str__(self):
         return f"LINE:{coord2es(self.a)}:{coord2es(self.b)}"
+
+
+class SectorLines:
+    """An ordered set of lines, regardless of their direction. Set operations run in linear time
+    and keep the order of the left operand."""
+
+    def __init__(self, *lines: Iterable[Line]):
+        self.lines: dict[tuple, Line] = {}
+        for line in chain.from_iterable(lines):
+            self.lines.setdefault(line.key, line)
+
+    def union(self, *others: Iterable[Line]) -> "SectorLines":
+        return SectorLines(self, *others)
+
+    def difference(self, *others: Iterable[Line]) -> "SectorLines":
+        keys = _keys(others)
+        return SectorLines(line for key, line in self.lines.items() if key not in keys)
+
+    def intersection(self, *others: Iterable[Line]) -> "SectorLines":
+        result = self.lines
+        for other in others:
+            keys = _keys([other])
+            result = {key: line for key, line in result.items() if key in keys}
+
+        return SectorLines(result.values())
+
+    def __or__(self, other: Iterable[Line]) -> "SectorLines":
+        return self.union(other)
+
+    def __sub__(self, other: Iterable[Line]) -> "SectorLines":
+        return self.difference(other)
+
+    def __and__(self, other: Iterable[Line]) -> "SectorLines":
+        return self.intersection(other)
+
+    def __iter__(self) -> Iterator[Line]:
+        return iter(self.lines.values())
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def __contains__(self, line) -> bool:
+        return isinstance(line, Line) and line.key in self.lines
+
+    def __str__(self):
+        return "\n".join(map(str, self))
+
+
+def _keys(lines: Sequence[Iterable[Line]]) -> Collection[tuple]:
+    if len(lines) == 1 and isinstance(lines[0], SectorLines):
+        return lines[0].lines
+
+    return {line.key for line in chain.from_iterable(lines)}
@@ -1,6 +1,161 @@
+import json
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+from shapely import Geometry
+from shapely.geometry import shape
 from shapely.io import from_geojson
 
+# Characters read from a streamed file at a time
+CHUNK_SIZE = 1 << 20
+WHITESPACE = " \t\r\n"
+
 
 def load_geojson(filename):
     with open(filename, "rb") as f:
         return from_geojson(f.read())
+
+
+def iter_features(filename, chunk_size: int = CHUNK_SIZE) -> Iterator[dict]:
+    """Yields the features of a GeoJSON FeatureCollection one at a time, reading the file in
+    chunks. Only the feature being decoded is kept in memory (and the other members of the
+    FeatureCollection, while they are skipped)."""
+    decoder = json.JSONDecoder()
+
+    with Path(filename).open(encoding="utf-8") as f:
+        reader = _ChunkReader(f, chunk_size)
+        reader.seek_features(decoder)
+
+        while True:
+            reader.skip(WHITESPACE + ",")
+            if reader.peek() == "]":
+                return
+
+            yield reader.decode(decoder)
+
+
+class FeatureStream:
+    """The features of a GeoJSON FeatureCollection, read from the file again on every iteration
+    so that only one of them is in memory at a time. Yields the shapely geometry (in the file's
+    lon/lat order, None if missing) and the properties of each feature."""
+
+    def __init__(self, filename) -> None:
+        self.filename = filename
+
+    def __iter__(self) -> Iterator[tuple[Geometry | None, dict]]:
+        for feature in iter_features(self.filename):
+            geometry = shape(feature["geometry"]) if feature.get("geometry") else None
+            yield geometry, feature.get("properties") or {}
+
+
+def load_geojson_features(filename, group_by: str | None = None) -> dict:
+    """Streams the features of a GeoJSON FeatureCollection into an array of shapely geometries
+    (in the file's lon/lat order, like load_geojson) and a list of their properties. With
+    group_by, the geometries are also grouped by the value of that property, in a dict named
+    By<group_by> like the AIXM lookup tables.
+
+    Only the JSON text is streamed, all geometries and properties are kept in memory. Use
+    FeatureStream to go through the features without holding them."""
+    geometries = []
+    properties = []
+    groups = {}
+
+    for feature in iter_features(filename):
+        geometry = shape(feature["geometry"]) if feature.get("geometry") else None
+        feature_properties = feature.get("properties") or {}
+        geometries.append(geometry)
+        properties.append(feature_properties)
+
+        if group_by is not None:
+            key = feature_properties.get(group_by)
+            if key not in groups:
+                groups[key] = [geometry]
+            else:
+                groups[key].append(geometry)
+
+    result = {"geometries": np.array(geometries, dtype=object), "properties": properties}
+    if group_by is not None:
+        result[f"By{group_by}"] = {
+            key: np.array(group, dtype=object) for key, group in groups.items()
+        }
+
+    return result
+
+
+class _ChunkReader:
+    """A text buffer filled from a file on demand, dropping what has been consumed"""
+
+    def __init__(self, file, chunk_size: int) -> None:
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+
+    def read(self) -> bool:
+        """Appends the next chunk, returns False at the end of the file"""
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            return False
+
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        if self.pos >= len(self.buffer) and not self.read():
+            msg = "Unexpected end of GeoJSON file"
+            raise ValueError(msg)
+
+        return self.buffer[self.pos]
+
+    def skip(self, characters: str) -> None:
+        while self.peek() in characters:
+            self.pos += 1
+
+    def expect(self, character: str) -> None:
+        """Moves past character, which must come next (after whitespace)"""
+        self.skip(WHITESPACE)
+        if self.peek() != character:
+            msg = f"Invalid GeoJSON file: expected {character!r}, got {self.peek()!r}"
+            raise ValueError(msg)
+
+        self.pos += 1
+
+    def decode(self, decoder: json.JSONDecoder):
+        """Decodes the JSON value at the current position, reading more chunks until it is
+        complete"""
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # The value continues in the next chunk
+                if not self.read():
+                    raise
+                continue
+
+            # A number ending with the buffer may continue in the next chunk as well
+            if end < len(self.buffer) or not self.read():
+                self.pos = end
+                return value
+
+    def seek_features(self, decoder: json.JSONDecoder) -> None:
+        """Moves past the opening bracket of the top-level "features" array, skipping the other
+        members of the FeatureCollection. Nested "features" keys (e.g. in properties) are not
+        considered."""
+        self.expect("{")
+
+        while True:
+            self.skip(WHITESPACE + ",")
+            if self.peek() == "}":
+                msg = "No FeatureCollection found in GeoJSON file"
+                raise ValueError(msg)
+
+            key = self.decode(decoder)
+            self.expect(":")
+            self.skip(WHITESPACE)
+            if key == "features" and self.peek() == "[":
+                self.pos += 1
+                return
+
+            self.decode(decoder)
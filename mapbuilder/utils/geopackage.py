@@ -1,5 +1,83 @@
+from dataclasses import dataclass, field
+
 import fiona
+import numpy as np
+import shapely
+from shapely.geometry import shape
+
+
+@dataclass
+class GeoPackageLayer:
+    """A GeoPackage layer read column by column: the feature ids, their geometries as a shapely
+    array in (lat, lon) order like the other data sources, and one array per attribute."""
+
+    ids: list[str]
+    geometries: np.ndarray
+    columns: dict[str, np.ndarray] = field(default_factory=dict)
+
+    def select(self, **values) -> np.ndarray:
+        """Returns the geometries of the features whose columns have the given values"""
+        mask = np.ones(len(self.geometries), dtype=bool)
+        for column, value in values.items():
+            mask &= self.columns[column] == value
+
+        return self.geometries[mask]
+
+    def __len__(self) -> int:
+        return len(self.geometries)
+
+
+def load_geopackage(filename, layers, columnar: bool = False) -> dict:
+    """Reads the given layers of a GeoPackage, either as lists of fiona records or, if columnar,
+    as GeoPackageLayer. Layers are given by name or as a table with the name and the optional
+    bbox (in the layer's coordinate order), where (an SQL condition) and columns (the attributes
+    to read) options, which are passed on to the reader so other features are never decoded."""
+    result = {}
+    for layer in layers:
+        options = {"name": layer} if isinstance(layer, str) else layer
+        name = options["name"]
+
+        with fiona.open(filename, layer=name, include_fields=options.get("columns")) as collection:
+            if "bbox" in options or "where" in options:
+                records = collection.filter(
+                    bbox=tuple(options["bbox"]) if "bbox" in options else None,
+                    where=options.get("where"),
+                )
+            else:
+                records = iter(collection)
+
+            if columnar:
+                result[name] = _read_columns(records, list(collection.schema["properties"]))
+            else:
+                result[name] = list(records)
+
+    return result
+
+
+def _read_columns(records, columns: list[str]) -> GeoPackageLayer:
+    ids = []
+    geometries = []
+    values = {column: [] for column in columns}
+
+    for record in records:
+        ids.append(record.id)
+        geometries.append(shape(record.geometry) if record.geometry is not None else None)
+        for column in columns:
+            values[column].append(record.properties[column])
+
+    # GeoPackages store (lon, lat)
+    geometries = shapely.transform(np.array(geometries, dtype=object), np.fliplr)
+
+    return GeoPackageLayer(
+        ids,
+        geometries,
+        {column: _column(column_values) for column, column_values in values.items()},
+    )
+
 
+def _column(values: list) -> np.ndarray:
+    """Numbers and strings get typed arrays, columns with missing values are kept as objects"""
+    if any(value is None for value in values):
+        return np.array(values, dtype=object)
 
-def load_geopackage(filename, layers) -> dict:
-    return {layer: list(fiona.open(filename, layer=layer)) for layer in layers}
+    return np.array(values)
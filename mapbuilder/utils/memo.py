@@ -0,0 +1,143 @@
+import functools
+import threading
+from collections import Counter, OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+
+import numpy as np
+
+# Named caches, their statistics are reported after a build
+_caches: dict[str, "LRUCache"] = {}
+
+
+class LRUCache:
+    """A thread-safe mapping that keeps the maxsize most recently used entries and counts hits
+    and misses. A maxsize of 0 disables caching. Caches with a name are registered for
+    stats() and clear(). Caches keyed by object identity hold references to the objects
+    they were computed from, see clear()."""
+
+    def __init__(self, maxsize: int, name: str | None = None, by_identity: bool = False) -> None:
+        self.maxsize = maxsize
+        self.name = name
+        self.by_identity = by_identity
+        self.stats = Counter()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        if name is not None:
+            _caches[name] = self
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.stats["misses"] += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def put(self, key: Hashable, value) -> None:
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def update(self, items: Iterable[tuple[Hashable, object]]) -> None:
+        for key, value in items:
+            self.put(key, value)
+
+    def items(self) -> list[tuple[Hashable, object]]:
+        """Returns all entries, least recently used first"""
+        with self._lock:
+            return list(self._entries.items())
+
+    def resize(self, maxsize: int) -> None:
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._entries) > max(0, maxsize):
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def stats() -> dict[str, Counter]:
+    """Returns a copy of the hit and miss counts of all named caches"""
+    return {name: cache.stats.copy() for name, cache in _caches.items()}
+
+
+def merge_stats(other: dict[str, Counter]) -> None:
+    """Adds the counts of stats() taken elsewhere, e.g. in a worker process"""
+    for name, counts in other.items():
+        if name in _caches:
+            _caches[name].stats.update(counts)
+
+
+def stats_since(before: dict[str, Counter]) -> dict[str, Counter]:
+    return {name: counts - before.get(name, Counter()) for name, counts in stats().items()}
+
+
+def clear(by_identity: bool = False) -> None:
+    """Empties all named caches, e.g. when the data they were computed from changed. With
+    by_identity, only caches keyed by object identity are emptied: their entries stay correct
+    for replaced data, but keep it alive."""
+    for cache in _caches.values():
+        if cache.by_identity or not by_identity:
+            cache.clear()
+
+
+def identity_key(thing) -> Hashable:
+    """Identifies a function argument by identity rather than by value: lists and tuples by the
+    ids of their items (templates create new lists of the same features all the time), anything
+    else by its own id."""
+    if isinstance(thing, list | tuple):
+        return type(thing).__name__, *map(id, thing)
+
+    return id(thing)
+
+
+def memoize(cache: LRUCache) -> Callable:
+    """Memoizes a function by the identity of its first argument and the values of all others.
+    The cache keeps a reference to the first argument, so its identity is not reused while the
+    result is cached. Callers get shallow copies of mutable results, so changing them does not
+    change the cached result."""
+
+    cache.by_identity = True
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(thing, *args, **kwargs):
+            key = (identity_key(thing), args, tuple(sorted(kwargs.items())))
+            try:
+                entry = cache.get(key)
+            except TypeError:
+                # Unhashable arguments
+                return func(thing, *args, **kwargs)
+
+            if entry is not None:
+                return _copy(entry[1])
+
+            result = func(thing, *args, **kwargs)
+            cache.put(key, (thing, result))
+            return _copy(result)
+
+        return wrapper
+
+    return decorator
+
+
+def _copy(result):
+    if isinstance(result, list | dict | set | np.ndarray):
+        return result.copy()
+
+    return result
@@ -0,0 +1,162 @@
+import math
+import threading
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+import shapely
+from shapely import Geometry, GeometryCollection
+
+from mapbuilder.data.aixm2 import AIXMFeature
+from mapbuilder.utils.geo import Fix
+from mapbuilder.utils.memo import LRUCache
+
+# Indexes built on the fly for collections that are not data sources (e.g. data.ad.Apron)
+LAZY_INDEXES = 256
+
+
+class SpatialIndex:
+    """An STRtree over the geometries of a collection of AIXM features, geometries or (nested)
+    dicts and lists of them, as loaded from AIXM, KML and GeoJSON sources.
+
+    Coordinates are (lat, lon), i.e. x is the latitude. Geometries of sources in (lon, lat) order
+    (GeoJSON) are flipped for the index if lon_lat is set, so they are queried the same way.
+    Queries return the matching items (features or geometries) unchanged, in their original
+    order."""
+
+    def __init__(self, data, lon_lat: bool = False) -> None:
+        self.items = []
+        geometries = []
+        owners = []
+        seen = set()
+
+        for item, item_geometries in _collect(data):
+            if id(item) in seen:
+                continue
+
+            seen.add(id(item))
+            geometries.extend(item_geometries)
+            owners.extend([len(self.items)] * len(item_geometries))
+            self.items.append(item)
+
+        self.geometries = np.array(geometries, dtype=object)
+        if lon_lat:
+            self.geometries = shapely.transform(self.geometries, np.fliplr)
+        self.owners = np.array(owners, dtype=np.int64)
+        self.tree = shapely.STRtree(self.geometries)
+
+    def within(self, bbox) -> list:
+        """Returns the items with a geometry inside bbox (min lat, min lon, max lat, max lon)"""
+        return self.__items(self.tree.query(shapely.box(*bbox), predicate="contains"))
+
+    def intersecting(self, geometry) -> list:
+        """Returns the items with a geometry intersecting any of the given geometries"""
+        geometries = [g for _, item_geometries in _collect(geometry) for g in item_geometries]
+        if not geometries:
+            return []
+
+        return self.__items(self.tree.query(geometries, predicate="intersects")[1])
+
+    def near(self, point, nm: float) -> list:
+        """Returns the items with a geometry within nm nautical miles of point. Distances are
+        measured in a local equirectangular projection around point."""
+        lat, lon = _lat_lon(point)
+        scale = math.cos(math.radians(lat))
+        dlat = nm / 60
+        dlon = dlat / max(scale, 1e-9)
+
+        candidates = self.tree.query(shapely.box(lat - dlat, lon - dlon, lat + dlat, lon + dlon))
+        projected = shapely.transform(self.geometries[candidates], lambda c: c * [1, scale])
+        distances = shapely.distance(shapely.Point(lat, lon * scale), projected) * 60
+
+        return self.__items(candidates[distances <= nm])
+
+    def __items(self, geometry_idx: np.ndarray) -> list:
+        return [self.items[idx] for idx in np.unique(self.owners[geometry_idx])]
+
+
+# Registered data sources by id: the data (keeping its id from being reused), whether it is in
+# (lon, lat) order and its index once built
+_indexes: dict[int, tuple[object, bool, SpatialIndex | None]] = {}
+_lazy_indexes = LRUCache(LAZY_INDEXES, "spatial index", by_identity=True)
+_lock = threading.Lock()
+
+
+def register(data, lon_lat: bool = False) -> None:
+    """Registers a loaded data source. Its index is built when it is queried for the first
+    time, so sources no template queries never pay for one."""
+    with _lock:
+        _indexes[id(data)] = (data, lon_lat, None)
+
+
+def unregister(data) -> None:
+    """Drops the index of a data source that is no longer used, e.g. because it was reloaded"""
+    with _lock:
+        entry = _indexes.get(id(data))
+        if entry is not None and entry[0] is data:
+            del _indexes[id(data)]
+
+
+def index_of(data) -> SpatialIndex:
+    """Returns the index of a registered data source, or builds (and caches) one for any other
+    collection"""
+    entry = _indexes.get(id(data))
+    if entry is not None and entry[0] is data:
+        if entry[2] is not None:
+            return entry[2]
+
+        index = SpatialIndex(data, entry[1])
+        with _lock:
+            # Keep it unless the source was unregistered in the meantime
+            if _indexes.get(id(data)) is entry:
+                _indexes[id(data)] = (data, entry[1], index)
+
+        return index
+
+    entry = _lazy_indexes.get(id(data))
+    if entry is not None and entry[0] is data:
+        return entry[1]
+
+    index = SpatialIndex(data)
+    _lazy_indexes.put(id(data), (data, index))
+    return index
+
+
+def within(data, bbox) -> list:
+    return index_of(data).within(bbox)
+
+
+def near(data, point, nm: float) -> list:
+    return index_of(data).near(point, nm)
+
+
+def intersecting(data, geometry) -> list:
+    return index_of(data).intersecting(geometry)
+
+
+def _collect(data) -> Iterator[tuple[object, list[Geometry]]]:
+    """Yields each item of data with its geometries"""
+    if isinstance(data, AIXMFeature):
+        yield data, data.geometries
+    elif isinstance(data, GeometryCollection):
+        for geometry in data.geoms:
+            yield geometry, [geometry]
+    elif isinstance(data, Geometry):
+        yield data, [data]
+    elif isinstance(data, dict):
+        for value in data.values():
+            yield from _collect(value)
+    elif isinstance(data, Iterable) and not isinstance(data, str):
+        for value in data:
+            yield from _collect(value)
+
+
+def _lat_lon(point) -> tuple[float, float]:
+    if isinstance(point, Fix):
+        point = point.coords()
+
+    if isinstance(point, shapely.Point):
+        return point.x, point.y
+    if isinstance(point, list | tuple):
+        return float(point[0]), float(point[1])
+
+    return float(point.lat), float(point.lon)
@@ -0,0 +1,52 @@
+import os
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TextIO
+
+
+class FragmentWriter:
+    """Writes fragments to a file as they are produced, separated by blank lines.
+    Fragments may be strings or iterables of chunks, empty fragments are skipped."""
+
+    def __init__(self, file: TextIO, separator: str = "\n\n") -> None:
+        self.file = file
+        self.separator = separator
+        self.count = 0
+
+    def append(self, fragment: str | Iterable[str] | None) -> None:
+        if fragment is None:
+            return
+
+        if isinstance(fragment, str):
+            fragment = (fragment,)
+
+        started = False
+        for chunk in fragment:
+            if not chunk:
+                continue
+
+            # Only separate fragments once they turn out to be non-empty
+            if not started:
+                if self.count:
+                    self.file.write(self.separator)
+                started = True
+
+            self.file.write(chunk)
+
+        if started:
+            self.count += 1
+
+
+@contextmanager
+def atomic_open(target: Path, encoding: str) -> Iterator[TextIO]:
+    """Opens a temporary file next to target for writing, which replaces target once the context
+    exits successfully. On errors, target is left untouched."""
+    tmp_file = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+
+    try:
+        with tmp_file.open(mode="w", encoding=encoding) as f:
+            yield f
+        tmp_file.replace(target)
+    finally:
+        tmp_file.unlink(missing_ok=True)
@@ -0,0 +1,82 @@
+import tomllib
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.synthetic import write_aixm, write_ese, write_kml, write_sct
+from mapbuilder.builder import Builder
+
+CONFIG = """\
+[data.ad]
+type = "aixm"
+source = "data/ad.aixm"
+[data.kml]
+type = "kml"
+source = "data/a.kml"
+root = "Top"
+[data.sct]
+type = "sct"
+source = "data/a.sct"
+[data.ese]
+type = "ese"
+source = "data/a.ese"
+
+[runways]
+
+[profiles.P1]
+aliases = []
+maps = [
+    {map = "apron", target = "p1_apron.txt"},
+    {map = "kml", target = "p1_kml.txt"},
+    {map = "rwy", target = "p1_rwy.txt"},
+]
+[profiles.P2]
+aliases = []
+maps = [{map = "rwy", target = "p2_rwy.txt"}, {map = "apron", target = "p2_apron.txt"}]
+"""
+
+MAPS = {
+    "apron/apron.jinja": (
+        '{{ data.ad.ApronElement.values() | list | geoms | to_poly("aprons", "APRON") }}\n'
+        '{{ combine(data.ad.ApronElement.values() | list | geoms) | to_poly("combined", "C") }}\n'
+    ),
+    "kml/k.jinja": "{% for k, v in data.kml.F0.items() %}{{ v | to_line(k) }}\n{% endfor %}",
+    "rwy/00_head.txt": "// runways\n",
+    "rwy/10_cl.jinja": (
+        "{% for icao, ad in data.sct.RUNWAY.items() %}{{ render_cl(ad) }}\n{% endfor %}"
+    ),
+    "rwy/20_variant.d/P1.txt": "// P1 variant\n",
+    "rwy/20_variant.d/P2.txt": "// P2 variant\n",
+}
+
+
+@pytest.fixture
+def project(tmp_path) -> SimpleNamespace:
+    """A source directory with AIXM, KML, SCT and ESE sources (the latter unused) and maps for
+    two profiles"""
+    source = tmp_path / "src"
+    (source / "data").mkdir(parents=True)
+    write_aixm(source / "data" / "ad.aixm", 40)
+    write_kml(source / "data" / "a.kml", 2, 30)
+    write_sct(source / "data" / "a.sct", 5)
+    write_ese(source / "data" / "a.ese", 5)
+
+    for name, content in MAPS.items():
+        path = source / "maps" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+    (source / "mapbuilder.toml").write_text(CONFIG, encoding="utf-8")
+    target = tmp_path / "out"
+    target.mkdir()
+
+    def builder(**kwargs) -> Builder:
+        with (source / "mapbuilder.toml").open("rb") as f:
+            config = tomllib.load(f)
+
+        return Builder(source, target, target / ".cache", config, **kwargs)
+
+    def outputs() -> dict[str, bytes]:
+        return {path.name: path.read_bytes() for path in sorted(target.glob("*.txt"))}
+
+    return SimpleNamespace(source=source, target=target, builder=builder, outputs=outputs)
@@ -0,0 +1,60 @@
+import pytest
+
+from benchmarks.aixm_parse import legacy_parse_aixm
+from benchmarks.synthetic import write_aixm
+from mapbuilder.data.aixm2 import parse_aixm
+from mapbuilder.data.aixm_cache import parse_aixm_cached
+
+
+@pytest.fixture
+def aixm_file(tmp_path):
+    return write_aixm(tmp_path / "ad.aixm", 60)
+
+
+def test_parser_matches_legacy_parser(aixm_file):
+    parsed = parse_aixm(aixm_file)
+
+    assert parsed == legacy_parse_aixm(aixm_file)
+    assert len(parsed["ApronElement"]) == 60
+
+
+def test_links_without_target_are_skipped(aixm_file, caplog):
+    content = aixm_file.read_text(encoding="utf-8")
+    for link in (
+        '<aixm:associatedApron xlink:href="urn:uuid:apn-0"/>',
+        '<aixm:markedTaxiway xlink:href="urn:uuid:twy-0"/>',
+    ):
+        content = content.replace(link, link.split(" ")[0] + "/>", 1)
+    aixm_file.write_text(content, encoding="utf-8")
+
+    parsed = parse_aixm(aixm_file)
+
+    assert parsed["ApronElement"]["ae-0"].apron is None
+    assert parsed["ApronElement"]["ae-1"].apron == "apn-0"
+    assert parsed["ApronElement"]["ae-0"] not in parsed["ApronElementByApron"]["APRON 0"]
+    assert parsed["TaxiwayMarking"]["tm-0"].marked_taxiway is None
+    assert "ApronElement ae-0 is not linked to a known apron" in caplog.text
+
+
+def test_empty_pos_lists_are_built_empty(aixm_file):
+    content = aixm_file.read_text(encoding="utf-8")
+    start = content.index("<gml:posList>")
+    end = content.index("</gml:posList>", start)
+    aixm_file.write_text(content[:start] + "<gml:posList> " + content[end:], encoding="utf-8")
+
+    parsed = parse_aixm(aixm_file)
+
+    assert parsed["ApronElement"]["ae-0"].geometries[0].is_empty
+    assert not parsed["ApronElement"]["ae-1"].geometries[0].is_empty
+
+
+@pytest.mark.parametrize("length", [0, 100])
+def test_truncated_caches_are_reparsed(aixm_file, tmp_path, caplog, length):
+    cache_file = tmp_path / "ad.aixm.pickle"
+    parse_aixm_cached(aixm_file, cache_file)
+    cache_file.write_bytes(cache_file.read_bytes()[:length])
+
+    parsed = parse_aixm_cached(aixm_file, cache_file)
+
+    assert parsed == parse_aixm(aixm_file)
+    assert "Cannot read parsed AIXM cache" in caplog.text
@@ -0,0 +1,196 @@
+import json
+import os
+import time
+from collections import Counter
+
+import pytest
+from jinja2 import TemplateAssertionError
+
+from mapbuilder import loader
+from mapbuilder.builder import Builder
+from mapbuilder.cache import HTTPClient
+
+
+@pytest.fixture
+def loads(monkeypatch, tmp_path):
+    """Records the data sources parsed by any process"""
+    log = tmp_path / "loads.log"
+    parse = loader._parse_data_source
+
+    def record(name, *args):
+        with log.open("a", encoding="utf-8") as f:
+            f.write(f"{name} {os.getpid()}\n")
+        return parse(name, *args)
+
+    monkeypatch.setattr(loader, "_parse_data_source", record)
+
+    def read() -> Counter:
+        if not log.exists():
+            return Counter()
+        lines = log.read_text(encoding="utf-8").split()
+        log.unlink()
+        return Counter(lines[::2])
+
+    return read
+
+
+@pytest.mark.parametrize(("jobs", "load_workers"), [(2, 1), (1, 2)])
+def test_cold_parallel_builds_load_each_source_once(project, loads, jobs, load_workers):
+    assert project.builder(load_workers=load_workers).build(jobs)
+
+    assert loads() == Counter(ad=1, kml=1, sct=1, ese=1)
+
+
+def test_parallel_builds_preload_the_recorded_sources(project, loads):
+    assert project.builder().build()
+    loads()
+
+    assert project.builder().build(jobs=2, maps=["rwy"], force=True)
+
+    assert loads() == Counter(sct=1)
+
+
+def test_expired_remote_sources_are_revalidated(project, monkeypatch):
+    with (project.source / "mapbuilder.toml").open("a", encoding="utf-8") as f:
+        f.write(
+            '[data.points]\ntype = "geojson"\nsource = "http://example.invalid/points.geojson"\n'
+            '[profiles.P3]\naliases = []\nmaps = [{map = "points", target = "p3_points.txt"}]\n',
+        )
+    (project.source / "maps" / "points").mkdir()
+    (project.source / "maps" / "points" / "p.jinja").write_text(
+        "{{ data.points.geoms | length }} points", encoding="utf-8"
+    )
+
+    remote = {"points": [[11.5, 48.1]]}
+    requests = []
+
+    def get(self, url, headers):
+        requests.append(headers)
+        collection = {"type": "MultiPoint", "coordinates": remote["points"]}
+        return 200, {}, json.dumps(collection).encode()
+
+    monkeypatch.setattr(HTTPClient, "get", get)
+
+    assert project.builder().build(profiles=["P3"])
+    assert project.builder().build(profiles=["P3"])
+    assert len(requests) == 1
+
+    remote["points"].append([11.6, 48.2])
+    # Not expired yet, the cached download is used
+    assert project.builder().build(profiles=["P3"])
+    assert project.outputs()["p3_points.txt"].endswith(b"1 points")
+
+    cached = project.target / ".cache" / "remote-points"
+    os.utime(cached, (0, 0))
+    assert project.builder().build(profiles=["P3"])
+
+    assert len(requests) == 2
+    assert project.outputs()["p3_points.txt"].endswith(b"2 points")
+
+
+def test_variants_of_other_profiles_do_not_rebuild_targets(project):
+    assert project.builder().build(maps=["rwy"])
+    for target in ("p1_rwy.txt", "p2_rwy.txt"):
+        os.utime(project.target / target, (0, 0))
+
+    (project.source / "maps" / "rwy" / "20_variant.d" / "P2.txt").write_text(
+        "// P2 variant, changed\n", encoding="utf-8"
+    )
+    assert project.builder().build(maps=["rwy"])
+
+    assert (project.target / "p1_rwy.txt").stat().st_mtime == 0
+    assert (project.target / "p2_rwy.txt").stat().st_mtime > 0
+    assert project.outputs()["p2_rwy.txt"].endswith(b"// P2 variant, changed\n")
+
+
+@pytest.mark.parametrize(("jobs", "load_workers"), [(2, 1), (2, 2), (1, 2)])
+def test_parallel_builds_match_serial_builds(project, jobs, load_workers):
+    assert project.builder().build()
+    serial = project.outputs()
+    for name in serial:
+        (project.target / name).unlink()
+
+    assert project.builder(load_workers=load_workers).build(jobs, force=True)
+
+    assert len(serial) == 5
+    assert project.outputs() == serial
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_templates_are_loaded_from_the_bytecode_cache(project, jobs):
+    builder = project.builder()
+    assert builder.build()
+    assert builder.jinja_handler.stats == Counter(compiled=3)
+
+    builder = project.builder()
+    assert builder.build(jobs, force=True)
+    # Every worker process loads the templates of its maps
+    assert builder.jinja_handler.stats["compiled"] == 0
+    assert builder.jinja_handler.stats["cached"] >= 3
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_targets_are_untouched_when_rendering_fails(project, jobs):
+    assert project.builder().build()
+    before = project.outputs()
+
+    (project.source / "maps" / "rwy" / "30_broken.jinja").write_text(
+        "{{ data.sct.RUNWAY | missing_filter }}", encoding="utf-8"
+    )
+    if jobs == 1:
+        with pytest.raises(TemplateAssertionError):
+            project.builder().build(jobs)
+    else:
+        # Workers report failed maps instead
+        assert not project.builder().build(jobs)
+
+    assert project.outputs() == before
+    assert not list(project.target.glob("*.tmp"))
+
+
+def test_watch_rebuilds_the_affected_targets(project, monkeypatch):
+    built = []
+    build_profile_map = Builder.build_profile_map
+
+    def record(self, profile_id, map_data):
+        built.append(map_data["target"])
+        return build_profile_map(self, profile_id, map_data)
+
+    def touch(path, content):
+        path.write_bytes(content)
+        os.utime(path, ns=(path.stat().st_mtime_ns + 10**9,) * 2)
+
+    kml = project.source / "data" / "a.kml"
+    changes = [
+        # A data source used by one map
+        lambda: touch(kml, kml.read_bytes() + b"\n"),
+        # The variant of one profile
+        lambda: touch(project.source / "maps" / "rwy" / "20_variant.d" / "P2.txt", b"// P2\n"),
+        # A file shared by all profiles
+        lambda: touch(project.source / "maps" / "rwy" / "00_head.txt", b"// rwy\n"),
+        # Nothing
+        lambda: None,
+    ]
+    rounds = []
+
+    def sleep(_):
+        rounds.append(sorted(built))
+        built.clear()
+        if not changes:
+            raise KeyboardInterrupt
+        changes.pop(0)()
+
+    monkeypatch.setattr(Builder, "build_profile_map", record)
+    monkeypatch.setattr(time, "sleep", sleep)
+
+    with pytest.raises(KeyboardInterrupt):
+        project.builder().watch(interval=0)
+
+    assert rounds == [
+        ["p1_apron.txt", "p1_kml.txt", "p1_rwy.txt", "p2_apron.txt", "p2_rwy.txt"],
+        ["p1_kml.txt"],
+        ["p2_rwy.txt"],
+        ["p1_rwy.txt", "p2_rwy.txt"],
+        [],
+    ]
+    assert b"\n\n// rwy\n\n" in project.outputs()["p2_rwy.txt"]
@@ -0,0 +1,128 @@
+import hashlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from mapbuilder.cache import Cache
+
+CONTENT = b"<AIXMBasicMessage/>"
+ETAG = '"v1"'
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        self.server.requests.append((self.path, self.client_address, dict(self.headers)))
+
+        if self.path == "/redirect":
+            self.send_response(302)
+            self.send_header("Location", "/moved")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path == "/moved":
+            self.send_response(301)
+            self.send_header("Location", f"http://{self.headers['Host']}/data")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path == "/data" and self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+        elif self.path == "/data":
+            self.send_response(200)
+            self.send_header("ETag", ETAG)
+            self.send_header("Content-Length", str(len(CONTENT)))
+            self.end_headers()
+            self.wfile.write(CONTENT)
+        else:
+            self.send_error(404)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    # Proxies make the client fall back to urllib
+    for variable in list(os.environ):
+        if variable.lower().endswith("_proxy"):
+            monkeypatch.delenv(variable)
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def url(server, path: str) -> str:
+    return f"http://127.0.0.1:{server.server_port}{path}"
+
+
+def expire(path) -> None:
+    os.utime(path, (0, 0))
+
+
+def test_expired_entries_are_revalidated(server, tmp_path):
+    cache = Cache(tmp_path)
+
+    path = cache.get("remote-ad", url(server, "/data"), ttl=1)
+    assert path.read_bytes() == CONTENT
+    # Fresh entries are not requested again
+    cache.get("remote-ad", url(server, "/data"), ttl=1)
+    assert len(server.requests) == 1
+
+    expire(path)
+    assert cache.get("remote-ad", url(server, "/data"), ttl=1) == path
+
+    assert len(server.requests) == 2
+    assert server.requests[1][2]["If-None-Match"] == ETAG
+    assert path.read_bytes() == CONTENT
+    # Touched after the 304, so it is fresh again
+    assert path.stat().st_mtime > time.time() - 60
+
+
+def test_redirects_are_followed(server, tmp_path):
+    path = Cache(tmp_path).get("remote-ad", url(server, "/redirect"))
+
+    assert path.read_bytes() == CONTENT
+    assert [request[0] for request in server.requests] == ["/redirect", "/moved", "/data"]
+
+
+def test_checksums_are_verified(server, tmp_path):
+    cache = Cache(tmp_path)
+    checksum = ("SHA-256", hashlib.sha256(CONTENT).hexdigest())
+
+    path = cache.get("dfs-ad", url(server, "/data"), checksum=checksum)
+    assert path.read_bytes() == CONTENT
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        cache.get("dfs-ad", url(server, "/data"), checksum=("SHA-256", "0" * 64))
+
+    # The entry of the previous checksum is kept
+    assert path.read_bytes() == CONTENT
+
+
+def test_connections_are_reused(server, tmp_path):
+    cache = Cache(tmp_path)
+
+    for idx in range(3):
+        cache.get(f"remote-{idx}", url(server, "/data"))
+
+    assert len(server.requests) == 3
+    assert len({request[1] for request in server.requests}) == 1
+
+
+def test_missing_resources_raise(server, tmp_path):
+    cache = Cache(tmp_path)
+
+    with pytest.raises(OSError, match="404"):
+        cache.get("remote-missing", url(server, "/missing"))
+
+    assert cache.cached("remote-missing") is None
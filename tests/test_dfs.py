@@ -0,0 +1,62 @@
+import pickle
+
+import pytest
+
+from mapbuilder.dfs.datasets import (
+    DatasetRelease,
+    _load_index,
+    get_dfs_aixm_url,
+    get_dfs_index_url,
+    get_dfs_url,
+)
+from mapbuilder.dfs.models import LeafItem
+
+RELEASE = DatasetRelease("ED_AD.xml", ("SHA-256", "0" * 64))
+INDEX = {123: {"EDDM": {"AIXM 5.1.1": RELEASE}}}
+URL = "https://aip.dfs.de/datasets/rest/123/ED_AD.xml"
+
+
+def test_urls_are_looked_up_in_the_datasets_of_an_amendment():
+    assert get_dfs_url(INDEX[123], 123, "EDDM", "AIXM 5.1.1") == URL
+    assert get_dfs_aixm_url(INDEX[123], 123, "EDDM") == URL
+    assert get_dfs_url(INDEX[123], 123, "EDDM", "OFMX") is None
+    assert get_dfs_url(INDEX[123], 123, "EDDF", "AIXM 5.1.1") is None
+
+
+def test_urls_are_looked_up_in_catalogue_items():
+    item = LeafItem.model_validate({
+        "type": "leaf",
+        "name": "EDDM",
+        "name_de": "EDDM",
+        "description": None,
+        "description_de": None,
+        "releases": [
+            {
+                "type": "AIXM 5.1.1",
+                "content": [],
+                "publishedDate": "2024-01-01",
+                "effectiveDate": "2024-01-25",
+                "filename": "ED_AD.xml",
+                "checksum": {"type": "SHA-256", "value": "0" * 64},
+            },
+        ],
+    })
+
+    assert get_dfs_aixm_url({"EDDM": item}, 123, "EDDM") == URL
+
+
+def test_urls_are_looked_up_in_the_index():
+    assert get_dfs_index_url(INDEX, 123, "EDDM", "AIXM 5.1.1") == URL
+    assert get_dfs_index_url(INDEX, 124, "EDDM", "AIXM 5.1.1") is None
+
+
+@pytest.mark.parametrize("content", [b"", b"cremoved_module\nIndex\n.", pickle.dumps([1])])
+def test_unreadable_indexes_are_rebuilt(tmp_path, content):
+    dataset_path = tmp_path / "dfs-aixm-rest"
+    dataset_path.write_text('{"Amdts": []}', encoding="utf-8")
+    (tmp_path / "dfs-aixm-rest.index").write_bytes(content)
+
+    index = _load_index(tmp_path / "dfs-aixm-rest.index", dataset_path)
+
+    assert index["available"] is None
+    assert index["amdts"] == {}
@@ -0,0 +1,86 @@
+import random
+from itertools import chain, starmap
+
+import pytest
+from more_itertools import unique_everseen
+from pygeodesy import ellipsoidalExact as geo_model
+
+from mapbuilder.handlers.jinja import render_sectorlines, sector_and, sector_or, sector_sub
+from mapbuilder.utils.geo import Line, SectorLines
+
+
+class LegacyLine(Line):
+    """The previous line, compared point by point in both directions and unhashable"""
+
+    def __eq__(self, other):
+        return (self.a == other.a and self.b == other.b) or (
+            self.a == other.b and self.b == other.a
+        )
+
+    __hash__ = None
+
+
+def legacy_sector_sub(a, b):
+    return [item for item in a if item not in b]
+
+
+def legacy_sector_and(a, b):
+    return [item for item in a if item in b]
+
+
+def legacy_render_sectorlines(*lines):
+    unique_lines = list(unique_everseen(chain(*lines)))
+    return "\n".join(map(str, unique_lines))
+
+
+def sector_borders(seed: int) -> list[list[tuple]]:
+    """Borders of random sectors sharing their points, as pairs of points in random direction"""
+    rnd = random.Random(seed)
+    points = [geo_model.LatLon(48 + idx // 8 / 10, 11 + idx % 8 / 10) for idx in range(64)]
+
+    borders = []
+    for _ in range(4):
+        border = []
+        for _ in range(40):
+            a, b = rnd.sample(points, 2)
+            border.append((a, b) if rnd.random() < 0.5 else (b, a))
+        borders.append(border)
+
+    return borders
+
+
+def lines(border, line_type=Line) -> list:
+    return list(starmap(line_type, border))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sector_operations_match_the_legacy_operations(seed):
+    a, b, c, d = sector_borders(seed)
+    # Shared borders, partly in the other direction
+    b += a[:10] + [(end, start) for start, end in a[10:20]]
+
+    def legacy(border):
+        return lines(border, LegacyLine)
+
+    assert list(map(str, sector_sub(lines(a), lines(b)))) == list(
+        map(str, legacy_sector_sub(legacy(a), legacy(b))),
+    )
+    assert list(map(str, sector_and(lines(a), lines(b)))) == list(
+        map(str, legacy_sector_and(legacy(a), legacy(b))),
+    )
+    assert str(sector_or(lines(a), lines(b), lines(c))) == legacy_render_sectorlines(
+        legacy(a), legacy(b), legacy(c)
+    )
+    assert render_sectorlines(lines(c), lines(d), lines(a)) == legacy_render_sectorlines(
+        legacy(c), legacy(d), legacy(a)
+    )
+
+
+def test_sector_lines_are_direction_independent():
+    p1, p2, p3 = (geo_model.LatLon(48, 11), geo_model.LatLon(48.1, 11), geo_model.LatLon(48, 11.1))
+    sector = SectorLines([Line(p1, p2), Line(p2, p3)])
+
+    assert Line(p2, p1) in sector
+    assert list(sector | [Line(p3, p2), Line(p3, p1)]) == [*sector, Line(p3, p1)]
+    assert list(sector - [Line(p2, p1)]) == [Line(p2, p3)]
+    assert list(sector & [Line(p3, p2)]) == [Line(p2, p3)]
@@ -0,0 +1,68 @@
+import pickle
+
+import pytest
+
+from mapbuilder.__main__ import main
+from mapbuilder.utils import geodesy
+from mapbuilder.utils.memo import LRUCache
+
+ENTRIES = [((48.1, 11.5, 1000.0, 90.0, "exact"), (48.1, 11.51))]
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = LRUCache(10, "geodesy")
+    monkeypatch.setattr(geodesy, "_cache", cache)
+    return cache
+
+
+def test_persisted_destinations_are_loaded(cache, tmp_path):
+    cache.update(ENTRIES)
+    geodesy.save_cache(tmp_path / "geodesy.pickle")
+    cache.clear()
+
+    geodesy.load_cache(tmp_path / "geodesy.pickle")
+
+    assert cache.items() == ENTRIES
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        pickle.dumps({"version": geodesy.CACHE_VERSION, "entries": ENTRIES})[:20],
+        pickle.dumps([ENTRIES]),
+        pickle.dumps({"version": geodesy.CACHE_VERSION}),
+        b"cmapbuilder.utils.geodesy\nRemovedClass\n.",
+        b"cremoved_module\nRemovedClass\n.",
+        b"garbage",
+    ],
+    ids=["truncated", "no_dict", "no_entries", "removed_class", "removed_module", "garbage"],
+)
+def test_unreadable_caches_are_ignored(cache, tmp_path, caplog, content):
+    (tmp_path / "geodesy.pickle").write_bytes(content)
+
+    geodesy.load_cache(tmp_path / "geodesy.pickle")
+
+    assert len(cache) == 0
+    assert "Cannot read geodesy cache" in caplog.text
+
+
+def test_unknown_models_are_rejected():
+    model = geodesy.get_model()
+
+    with pytest.raises(ValueError, match="Unknown geodesy model karney"):
+        geodesy.set_model("karney")
+
+    assert geodesy.get_model() == model
+
+
+def test_unknown_configured_models_are_rejected(project, capsys):
+    with (project.source / "mapbuilder.toml").open("a", encoding="utf-8") as f:
+        f.write('[geodesy]\nmodel = "karney"\n')
+
+    with pytest.raises(SystemExit) as excinfo:
+        main("mapbuilder", "-s", str(project.source), str(project.target))
+
+    assert excinfo.value.code == 2
+    assert "Unknown geodesy model karney, expected one of" in capsys.readouterr().err
+    assert project.outputs() == {}
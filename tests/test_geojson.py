@@ -0,0 +1,90 @@
+import json
+
+import pytest
+import shapely
+
+from mapbuilder.loader import DataSources
+from mapbuilder.utils.geojson import (
+    CHUNK_SIZE,
+    FeatureStream,
+    iter_features,
+    load_geojson,
+    load_geojson_features,
+)
+
+FEATURES = [
+    {
+        "type": "Feature",
+        "properties": {"name": "EDDM", "elevation": 1487.25},
+        "geometry": {"type": "Point", "coordinates": [11.786086, 48.353783]},
+    },
+    {
+        "type": "Feature",
+        "properties": {"name": "RWY", "features": [{"type": "Feature"}]},
+        "geometry": {"type": "LineString", "coordinates": [[11.75, 48.36], [11.81, 48.35]]},
+    },
+    {"type": "Feature", "properties": None, "geometry": None},
+]
+
+
+def write(path, collection, indent=None):
+    path.write_text(json.dumps(collection, indent=indent), encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, CHUNK_SIZE])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_features_are_read_in_chunks(tmp_path, chunk_size, indent):
+    collection = {"type": "FeatureCollection", "features": FEATURES}
+    path = write(tmp_path / "a.geojson", collection, indent)
+
+    assert list(iter_features(path, chunk_size)) == FEATURES
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, CHUNK_SIZE])
+def test_only_top_level_features_are_read(tmp_path, chunk_size):
+    collection = {
+        "type": "FeatureCollection",
+        "name": "features",
+        "metadata": {"features": [{"type": "Feature", "properties": {"name": "nested"}}]},
+        "bbox": [11.75, 48.35, 11.81, 48.36],
+        "features": FEATURES,
+        "crs": {"type": "name", "properties": {"name": "urn:ogc:def:crs:OGC:1.3:CRS84"}},
+    }
+    path = write(tmp_path / "a.geojson", collection)
+
+    assert list(iter_features(path, chunk_size)) == FEATURES
+
+
+def test_nested_features_only_are_rejected(tmp_path):
+    path = write(tmp_path / "a.geojson", {"type": "Feature", "properties": {"features": []}})
+
+    with pytest.raises(ValueError, match="No FeatureCollection"):
+        list(iter_features(path))
+
+
+def test_loaded_features_match_load_geojson(tmp_path):
+    # GEOS does not read features without a geometry
+    path = write(tmp_path / "a.geojson", {"type": "FeatureCollection", "features": FEATURES[:2]})
+
+    loaded = load_geojson_features(path, group_by="name")
+
+    assert all(shapely.equals(loaded["geometries"], shapely.get_parts(load_geojson(path))))
+    assert loaded["properties"] == [feature["properties"] for feature in FEATURES[:2]]
+    assert list(loaded["Byname"]) == ["EDDM", "RWY"]
+
+
+def test_feature_streams_are_read_on_every_iteration(tmp_path):
+    path = write(tmp_path / "a.geojson", {"type": "FeatureCollection", "features": FEATURES})
+    sources = {"gj": {"type": "geojson", "source": path.name, "iterate": True}}
+    stream = DataSources(sources, lambda _, config: tmp_path / config["source"])["gj"]
+
+    assert isinstance(stream, FeatureStream)
+    assert [properties for _, properties in stream] == [
+        FEATURES[0]["properties"],
+        FEATURES[1]["properties"],
+        {},
+    ]
+
+    write(tmp_path / "a.geojson", {"type": "FeatureCollection", "features": FEATURES[:1]})
+    assert [geometry for geometry, _ in stream] == [shapely.Point(11.786086, 48.353783)]
@@ -0,0 +1,84 @@
+import fiona
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import mapping, shape
+
+from mapbuilder.utils.geopackage import GeoPackageLayer, load_geopackage
+
+SCHEMA = {
+    "geometry": "LineString",
+    "properties": {"name": "str", "surface": "str", "width": "float"},
+}
+
+
+@pytest.fixture
+def geopackage(tmp_path):
+    path = tmp_path / "ad.gpkg"
+    with fiona.open(path, "w", "GPKG", SCHEMA, "EPSG:4326", layer="taxiways") as f:
+        for idx in range(40):
+            lon, lat = 11 + idx / 100, 48 + idx % 7 / 100
+            f.write({
+                "geometry": mapping(shapely.LineString([(lon, lat), (lon + 0.005, lat + 0.002)])),
+                "properties": {
+                    "name": f"TWY {idx}",
+                    "surface": None if idx % 5 == 0 else ("ASP", "CONC")[idx % 2],
+                    "width": 15.0 + idx % 3,
+                },
+            })
+
+    return path
+
+
+def flipped(geometry) -> shapely.Geometry:
+    return shapely.transform(shape(geometry), np.fliplr)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"where": "surface = 'ASP'"},
+        {"bbox": [11.1, 48.0, 11.25, 48.1]},
+        {"bbox": [11.1, 48.0, 11.25, 48.1], "where": "width > 15", "columns": ["name"]},
+    ],
+    ids=["all", "where", "bbox", "bbox_where_columns"],
+)
+def test_columnar_layers_match_records(geopackage, options):
+    layers = [{"name": "taxiways", **options}]
+
+    records = load_geopackage(geopackage, layers)["taxiways"]
+    layer = load_geopackage(geopackage, layers, columnar=True)["taxiways"]
+
+    assert isinstance(layer, GeoPackageLayer)
+    assert 0 < len(layer) < 40 if options else len(layer) == 40
+    assert layer.ids == [record.id for record in records]
+    assert list(layer.geometries) == [flipped(record.geometry) for record in records]
+    assert list(layer.columns) == options.get("columns", list(SCHEMA["properties"]))
+    for column, values in layer.columns.items():
+        assert values.tolist() == [record.properties[column] for record in records]
+
+
+def test_filters_are_applied_by_the_reader(geopackage):
+    every = load_geopackage(geopackage, ["taxiways"])["taxiways"]
+    options = {"name": "taxiways", "bbox": [11.1, 48.0, 11.25, 48.1], "where": "width > 15"}
+
+    layer = load_geopackage(geopackage, [options], columnar=True)["taxiways"]
+
+    bbox = shapely.box(*options["bbox"])
+    expected = [
+        record.properties["name"]
+        for record in every
+        if record.properties["width"] > 15 and shape(record.geometry).envelope.intersects(bbox)
+    ]
+    assert layer.columns["name"].tolist() == expected
+
+
+def test_features_are_selected_by_column(geopackage):
+    layer = load_geopackage(geopackage, ["taxiways"], columnar=True)["taxiways"]
+
+    assert layer.columns["surface"].dtype == object
+    assert layer.columns["width"].dtype == np.float64
+    assert len(layer.select(surface="ASP")) == len(
+        [value for value in layer.columns["surface"] if value == "ASP"],
+    )
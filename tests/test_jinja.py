@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+import shapely
+
+from mapbuilder.handlers.jinja import combine, coord2es, to_coordline, to_line, to_poly
+
+LINE = shapely.LineString([(48.1, 11.5), (48.15, 11.55), (48.2, 11.6)])
+RING = shapely.LinearRing([(48.1, 11.5), (48.1, 11.6), (48.2, 11.6), (48.2, 11.5)])
+POLYGON = shapely.Polygon(RING, holes=[[(48.12, 11.52), (48.12, 11.54), (48.14, 11.54)]])
+MULTI_LINE = shapely.MultiLineString([LINE, shapely.LineString([(49.0, 12.0), (49.1, 12.1)])])
+
+
+def legacy_render_polygon(lines, polygons, color=None, coordpoly=False):
+    if not coordpoly and color is not None:
+        lines.append(f"COLOR:{color}")
+    else:
+        lines.append("")
+
+    for polygon in polygons:
+        if coordpoly:
+            if color is not None:
+                lines.append(f"COLOR:{color}")
+            else:
+                lines.append("")
+        else:
+            lines.append("COORDTYPE:OTHER:REGION")
+        for point in polygon.coords:
+            lines.append(f"COORD:{coord2es((point[0], point[1]))}")
+
+
+def legacy_render_coords(lines, linestring):
+    for geometry in linestring:
+        for point in geometry.coords:
+            lines.append(f"COORD:{point[0]}:{point[1]}")
+
+        lines.append("")
+
+
+def legacy_render_linestring(lines, linestring):
+    for geometry in linestring:
+        count = len(geometry.coords)
+
+        for idx, point in enumerate(geometry.coords):
+            if idx == count - 1:
+                break
+
+            lines.append(
+                f"LINE:{coord2es((point[0], point[1]))}"
+                f":{coord2es((geometry.coords[idx + 1][0], geometry.coords[idx + 1][1]))}",
+            )
+        lines.append("")
+
+
+def legacy(render, geometries, *args) -> list[str]:
+    lines = []
+    render(lines, geometries, *args)
+    return lines
+
+
+GEOMETRIES = {
+    "line": (LINE, [LINE]),
+    "ring": (RING, [RING]),
+    "polygon": (POLYGON, [POLYGON.exterior]),
+    "multi_line": (MULTI_LINE, list(MULTI_LINE.geoms)),
+    "parts": (MULTI_LINE.geoms, list(MULTI_LINE.geoms)),
+    "array": (np.array([LINE, RING, shapely.LineString()]), [LINE, RING, shapely.LineString()]),
+    "list": ([RING, shapely.LineString(), LINE], [RING, shapely.LineString(), LINE]),
+    "empty": ([], []),
+}
+
+
+@pytest.mark.parametrize("name", GEOMETRIES)
+def test_renderers_match_the_legacy_renderers(name):
+    geometries, parts = GEOMETRIES[name]
+
+    assert to_line(geometries, "L") == "\n".join(
+        ["// L", *legacy(legacy_render_linestring, parts)],
+    )
+    assert to_coordline(geometries, "C") == "\n".join(
+        ["// C", *legacy(legacy_render_coords, parts), "COORDLINE", ""],
+    )
+    assert to_poly(geometries, "P", "APRON") == "\n".join(
+        ["// P", *legacy(legacy_render_polygon, parts, "APRON", False)],
+    )
+    assert to_poly(geometries, "", "APRON", "AREA") == "\n".join(
+        [*legacy(legacy_render_polygon, parts, "APRON", "AREA"), "COORDPOLY:AREA", ""],
+    )
+
+
+@pytest.mark.parametrize("geometries", [[LINE, POLYGON], [MULTI_LINE], [LINE, None]])
+def test_geometries_without_a_coordinate_sequence_are_rejected(geometries):
+    with pytest.raises(TypeError, match="Cannot render"):
+        to_line(geometries, "L")
+
+    with pytest.raises(TypeError, match="Cannot render"):
+        to_poly(geometries, "P")
+
+
+def test_coverage_union_matches_union_of_non_overlapping_areas():
+    # Adjacent cells of a grid, as rings and as closed line strings, and a separate area
+    cells = [
+        shapely.box(48 + row / 100, 11 + col / 100, 48 + (row + 1) / 100, 11 + (col + 1) / 100)
+        for row in range(6)
+        for col in range(6)
+        if (row, col) != (2, 3)
+    ]
+    geometries = [
+        cell.exterior if idx % 2 else shapely.LineString(cell.exterior.coords)
+        for idx, cell in enumerate(cells)
+    ]
+    geometries.append(shapely.box(49, 12, 49.01, 12.01).exterior)
+
+    covered = combine(geometries, coverage=True)
+    united = combine(geometries)
+
+    assert covered.equals(united)
+    assert covered.area == pytest.approx(united.area)
+    assert len(covered.geoms) == 2
+    assert len(covered.geoms[0].interiors) + len(covered.geoms[1].interiors) == 1
@@ -0,0 +1,61 @@
+import itertools
+
+import numpy as np
+import pytest
+import shapely
+
+from benchmarks.synthetic import write_kml
+from mapbuilder.data import parsing
+from mapbuilder.data.kml import KMLParser, parse_kml
+
+KML = """<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2"><Document><name>Doc</name>
+<Folder><name>Top</name>
+  <Folder><name>Stands</name>
+    <Placemark><name>A1</name><Point><coordinates>11.5,48.1,0</coordinates></Point></Placemark>
+    <Placemark><name>A1</name><Point><coordinates>11.6,48.2</coordinates></Point></Placemark>
+  </Folder>
+  <Placemark><name>Apron</name><Polygon><outerBoundaryIs><LinearRing>
+    <coordinates>11.5,48.1 11.6,48.1 11.6,48.2 11.5,48.1</coordinates>
+  </LinearRing></outerBoundaryIs></Polygon></Placemark>
+  <Placemark><name>Line</name><LineString><coordinates>11.5,48.1,0 11.6,48.2,0</coordinates>
+  </LineString></Placemark>
+</Folder></Document></kml>
+"""
+
+
+@pytest.mark.parametrize("root", [None, "Top"])
+def test_parser_matches_legacy_parser(tmp_path, root):
+    path = tmp_path / "a.kml"
+    path.write_text(KML, encoding="utf-8")
+
+    parsed = parse_kml(path, root)
+
+    assert parsed == KMLParser(path, root).parse()
+    top = parsed if root else parsed["Top"]
+    assert top["Stands"]["A1"] == [shapely.Point(48.1, 11.5), shapely.Point(48.2, 11.6)]
+    assert isinstance(top["Apron"][0], shapely.LinearRing)
+
+
+def test_synthetic_documents_match_legacy_parser(tmp_path):
+    path = write_kml(tmp_path / "a.kml", 5, 40)
+
+    assert parse_kml(path, "Top") == KMLParser(path, "Top").parse()
+
+
+def test_geometries_are_built_in_order_across_batches():
+    constructors = {
+        parsing.LINE: shapely.LineString,
+        parsing.RING: shapely.LinearRing,
+        parsing.POINT: lambda coords: shapely.Point(coords[0]),
+    }
+    kinds = [parsing.LINE, parsing.RING, parsing.POINT] * 4
+    parts = [np.array([[48.0 + idx, 11.0], [48.5, 11.5], [48.0, 11.5]]) for idx in range(12)]
+
+    batch = parsing.GeometryBatch(batch_size=5)
+    indexes = list(itertools.starmap(batch.add, zip(kinds, parts, strict=True)))
+
+    assert indexes == list(range(12))
+    assert batch.build() == [
+        constructors[kind](coords) for kind, coords in zip(kinds, parts, strict=True)
+    ]
@@ -0,0 +1,149 @@
+import pytest
+
+from benchmarks.synthetic import write_aixm, write_ese, write_kml, write_sct
+from mapbuilder import loader
+from mapbuilder.loader import DataSourceError, DataSources, ParallelLoader
+from mapbuilder.utils.geo import Fix
+
+SOURCES = {
+    "ad": {"type": "aixm", "source": "ad.aixm"},
+    "kml": {"type": "kml", "source": "a.kml", "root": "Top"},
+    "sct": {"type": "sct", "source": "a.sct"},
+    "ese": {"type": "ese", "source": "a.ese"},
+}
+
+
+@pytest.fixture
+def sources(tmp_path):
+    write_aixm(tmp_path / "ad.aixm", 20)
+    write_kml(tmp_path / "a.kml", 2, 10)
+    write_sct(tmp_path / "a.sct", 3)
+    write_ese(tmp_path / "a.ese", 3)
+
+    def resolve(name, source_config):
+        if source_config["source"] == "unresolvable":
+            msg = f"Cannot resolve {name}"
+            raise OSError(msg)
+
+        return tmp_path / source_config["source"]
+
+    return resolve
+
+
+def comparable(data):
+    """Replaces the fixes of parsed runways, which do not compare by value"""
+    if isinstance(data, dict):
+        return {key: comparable(value) for key, value in data.items()}
+    if isinstance(data, Fix):
+        return data.es_coords()
+
+    return data
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_parallel_loads_match_serial_loads(sources, executor):
+    serial = ParallelLoader().load(SOURCES, sources)
+
+    loaded = ParallelLoader(2, executor).load(SOURCES, sources)
+
+    assert list(loaded) == list(SOURCES)
+    assert comparable(loaded) == comparable(serial)
+
+
+@pytest.mark.parametrize(("workers", "executor"), [(1, "thread"), (2, "thread"), (2, "process")])
+def test_all_failed_sources_are_raised(sources, workers, executor):
+    failing = {
+        **SOURCES,
+        "missing": {"type": "sct", "source": "missing.sct"},
+        "unresolvable": {"type": "aixm", "source": "unresolvable"},
+    }
+
+    with pytest.raises(DataSourceError) as excinfo:
+        ParallelLoader(workers, executor).load(failing, sources)
+
+    assert set(excinfo.value.failures) == {"missing", "unresolvable"}
+    assert isinstance(excinfo.value.failures["missing"], OSError)
+    assert "missing" in str(excinfo.value)
+    assert "unresolvable" in str(excinfo.value)
+
+
+@pytest.fixture
+def data_sources(sources, monkeypatch):
+    parsed = []
+    parse = loader._parse_data_source
+
+    def record(name, *args):
+        parsed.append(name)
+        return parse(name, *args)
+
+    monkeypatch.setattr(loader, "_parse_data_source", record)
+    return DataSources(SOURCES, sources), parsed
+
+
+def test_data_sources_are_loaded_on_first_use(data_sources):
+    data, parsed = data_sources
+
+    assert "sct" in data
+    assert list(data) == list(SOURCES)
+    assert parsed == []
+
+    assert data["sct"] is data["sct"]
+    assert parsed == ["sct"]
+    assert data.is_loaded("sct")
+    assert not data.is_loaded("ad")
+
+    with pytest.raises(KeyError):
+        data["unknown"]
+
+
+def test_used_data_sources_are_tracked(data_sources):
+    data, _ = data_sources
+
+    with data.track() as outer:
+        data["sct"]
+        with data.track() as inner:
+            data["ese"]
+        data["kml"]
+
+    data["ad"]
+
+    assert outer == {"sct", "kml"}
+    assert inner == {"ese"}
+
+
+def test_invalidated_data_sources_are_reloaded(data_sources):
+    data, parsed = data_sources
+    sct = data["sct"]
+
+    data.invalidate("sct")
+
+    assert not data.is_loaded("sct")
+    assert data["sct"] is not sct
+    assert parsed == ["sct", "sct"]
+
+
+def test_failures_are_remembered_until_invalidated(tmp_path, data_sources):
+    data, parsed = data_sources
+    sct = (tmp_path / "a.sct").read_bytes()
+    (tmp_path / "a.sct").unlink()
+
+    for _ in range(2):
+        with pytest.raises(DataSourceError) as excinfo:
+            data["sct"]
+        assert list(excinfo.value.failures) == ["sct"]
+
+    assert parsed == ["sct"]
+
+    (tmp_path / "a.sct").write_bytes(sct)
+    data.invalidate("sct")
+    assert "RUNWAY" in data["sct"]
+
+
+def test_preloaded_data_sources_are_not_loaded_again(data_sources):
+    data, parsed = data_sources
+    data["sct"]
+
+    data.preload(ParallelLoader(2), ["sct", "ese"])
+    data["ese"]
+
+    assert parsed == ["sct", "ese"]
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from mapbuilder.utils.memo import LRUCache, memoize
+
+
+@pytest.mark.parametrize(
+    ("result", "mutate"),
+    [
+        ([1, 2], lambda value: value.append(3)),
+        ({"a": 1}, lambda value: value.update(b=2)),
+        (np.array([1, 2]), lambda value: value.fill(0)),
+    ],
+)
+def test_mutable_results_are_copied(result, mutate):
+    calls = []
+
+    @memoize(LRUCache(4))
+    def compute(thing):
+        calls.append(thing)
+        return result.copy()
+
+    thing = object()
+    first = compute(thing)
+    mutate(first)
+    second = compute(thing)
+    mutate(second)
+
+    assert len(calls) == 1
+    assert np.array_equal(compute(thing), result)
+
+
+def test_results_are_memoized_by_identity():
+    @memoize(LRUCache(4))
+    def total(values, factor=1):
+        return sum(values) * factor
+
+    values = [1, 2]
+    assert total(values) == 3
+    values.append(3)
+    # The same list with other items is another key
+    assert total(values) == 6
+    assert total(values, factor=2) == 12
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+import shapely
+
+from mapbuilder.data.parsing import LINE, POINT, RING, GeometryBatch, build_geometries
+
+LINE_COORDS = np.array([[48.0, 11.0], [48.5, 11.5]])
+RING_COORDS = np.array([[48.0, 11.0], [48.5, 11.5], [48.0, 11.5]])
+EMPTY = np.empty((0, 2))
+
+
+@pytest.mark.parametrize("position", [0, 1, 2])
+@pytest.mark.parametrize("kind", [LINE, RING, POINT])
+def test_parts_without_coordinates_are_built_empty(kind, position):
+    parts = [(LINE, LINE_COORDS), (RING, RING_COORDS)]
+    parts.insert(position, (kind, EMPTY))
+
+    batch = GeometryBatch()
+    for part_kind, coords in parts:
+        batch.add(part_kind, coords)
+    geometries = batch.build()
+
+    assert len(geometries) == 3
+    assert geometries[position].is_empty
+    assert (
+        geometries[position].geom_type
+        == {
+            LINE: "LineString",
+            RING: "LinearRing",
+            POINT: "Point",
+        }[kind]
+    )
+    others = [geometry for idx, geometry in enumerate(geometries) if idx != position]
+    assert others == [shapely.LineString(LINE_COORDS), shapely.LinearRing(RING_COORDS)]
+
+
+def test_flat_coordinates_without_a_geometry_index_are_built_empty():
+    geometries = build_geometries(
+        np.concatenate([LINE_COORDS, RING_COORDS]),
+        np.array([0, 0, 2, 2, 2]),
+        np.array([False, False, True, True]),
+    )
+
+    assert list(geometries) == [
+        shapely.LineString(LINE_COORDS),
+        shapely.LineString(),
+        shapely.LinearRing(RING_COORDS),
+        shapely.LinearRing(),
+    ]
@@ -0,0 +1,29 @@
+from mapbuilder.profiling import Profiler
+
+
+def event(name: str, category: str, duration: float) -> dict:
+    return {"name": name, "cat": category, "dur": duration * 1e6, "args": {"peak_memory": 0}}
+
+
+def test_summary_ranks_spans_within_their_category():
+    profiler = Profiler()
+    profiler.merge([
+        event("load ad", "data", 0.5),
+        event("write a.txt", "target", 4.0),
+        event("maps/a/a.jinja", "item", 3.0),
+        event("write b.txt", "target", 2.0),
+        event("maps/b/b.jinja", "item", 1.0),
+        event("maps/a/b.txt", "item", 0.1),
+        event("fetch ad", "fetch", 0.2),
+    ])
+
+    lines = profiler.summary(top=2)
+
+    assert [line.rsplit(maxsplit=3)[:2] for line in lines[1:]] == [
+        ["write a.txt", "target"],
+        ["write b.txt", "target"],
+        ["maps/a/a.jinja", "item"],
+        ["maps/b/b.jinja", "item"],
+        ["load ad", "data"],
+        ["fetch ad", "fetch"],
+    ]
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+import shapely
+
+from mapbuilder.loader import DataSources
+from mapbuilder.utils import spatial
+
+_Index = spatial.SpatialIndex
+
+MUNICH = {"type": "Point", "coordinates": [11.5, 48.1]}
+HAMBURG = {"type": "Point", "coordinates": [10.0, 53.5]}
+
+
+@pytest.fixture
+def geojson_file(tmp_path):
+    path = tmp_path / "points.geojson"
+    features = [
+        {"type": "Feature", "properties": {"name": name}, "geometry": geometry}
+        for name, geometry in (("EDDM", MUNICH), ("EDDH", HAMBURG))
+    ]
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": features}))
+    return path
+
+
+@pytest.mark.parametrize("options", [{}, {"stream": True}])
+def test_geojson_sources_are_queried_in_lat_lon(geojson_file, options):
+    sources = {"gj": {"type": "geojson", "source": geojson_file.name, **options}}
+    data = DataSources(sources, lambda _, config: geojson_file.parent / config["source"])["gj"]
+
+    assert spatial.within(data, (48, 11, 49, 12)) == [shapely.Point(11.5, 48.1)]
+    assert spatial.near(data, (48.1, 11.5), 1) == [shapely.Point(11.5, 48.1)]
+    assert spatial.intersecting(data, shapely.box(53, 9, 54, 11)) == [shapely.Point(10.0, 53.5)]
+    # Queries in (lon, lat) order find nothing
+    assert spatial.within(data, (11, 48, 12, 49)) == []
+
+
+def test_lat_lon_geometries_are_indexed_unchanged():
+    points = [shapely.Point(48.1, 11.5), shapely.Point(53.5, 10.0)]
+
+    assert spatial.within(points, (48, 11, 49, 12)) == [points[0]]
+    assert spatial.near(points, (53.5, 10.0), 1) == [points[1]]
+
+
+def test_registered_sources_are_indexed_on_first_query(monkeypatch):
+    points = [shapely.Point(48.1, 11.5)]
+    built = []
+    monkeypatch.setattr(spatial, "SpatialIndex", lambda *args: built.append(args) or _Index(*args))
+
+    spatial.register(points)
+    assert built == []
+
+    spatial.within(points, (48, 11, 49, 12))
+    spatial.near(points, (48.1, 11.5), 1)
+    assert built == [(points, False)]
+
+    spatial.unregister(points)
@@ -0,0 +1,45 @@
+import io
+
+import pytest
+
+from mapbuilder.writer import FragmentWriter, atomic_open
+
+
+def test_empty_fragments_are_not_separated():
+    file = io.StringIO()
+    writer = FragmentWriter(file)
+
+    writer.append("// header")
+    writer.append("")
+    writer.append(None)
+    writer.append(iter(["", ""]))
+    writer.append(iter(["", "LINE:1:2", "", ":3:4"]))
+    writer.append(iter([]))
+    writer.append("COORD:1:2")
+
+    assert file.getvalue() == "// header\n\nLINE:1:2:3:4\n\nCOORD:1:2"
+    assert writer.count == 3
+
+
+def test_targets_are_replaced_once_complete(tmp_path):
+    target = tmp_path / "map.txt"
+    target.write_text("previous", encoding="iso-8859-1")
+
+    with atomic_open(target, "iso-8859-1") as f:
+        f.write("current")
+        assert target.read_text(encoding="iso-8859-1") == "previous"
+
+    assert target.read_text(encoding="iso-8859-1") == "current"
+    assert list(tmp_path.iterdir()) == [target]
+
+
+def test_targets_are_untouched_on_errors(tmp_path):
+    target = tmp_path / "map.txt"
+    target.write_text("previous", encoding="iso-8859-1")
+
+    with pytest.raises(RuntimeError), atomic_open(target, "iso-8859-1") as f:
+        f.write("partial")
+        raise RuntimeError
+
+    assert target.read_text(encoding="iso-8859-1") == "previous"
+    assert list(tmp_path.iterdir()) == [target]